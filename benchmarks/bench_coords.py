@@ -0,0 +1,72 @@
+"""Benchmark the batch coordinate transforms against the scalar ones.
+
+    python -m benchmarks.bench_coords --points 100000
+
+Reports the time of both paths per transform and checks that their results are identical.
+Requires numpy for the vectorized path.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.lixiang import coord_transform as ct  # noqa: E402
+
+TRANSFORMS = [
+    ('wgs84_to_gcj02', ct.wgs84_to_gcj02, ct.wgs84_to_gcj02_batch, {}),
+    ('gcj02_to_wgs84', ct.gcj02_to_wgs84, ct.gcj02_to_wgs84_batch, {}),
+    ('gcj02_to_wgs84_exact', ct.gcj02_to_wgs84_exact, ct.gcj02_to_wgs84_batch, {'exact': True}),
+    ('gcj02_to_bd09', ct.gcj02_to_bd09, ct.gcj02_to_bd09_batch, {}),
+    ('bd09_to_gcj02', ct.bd09_to_gcj02, ct.bd09_to_gcj02_batch, {}),
+]
+
+
+def random_track(points):
+    """A random walk around Beijing, with a few points outside of China."""
+    lng, lat = 116.4074, 39.9042
+    lngs, lats = [], []
+    for i in range(points):
+        lng += random.uniform(-0.001, 0.001)
+        lat += random.uniform(-0.001, 0.001)
+        if i % 1000 == 999:
+            lngs.append(lng - 100)
+            lats.append(lat)
+            continue
+        lngs.append(lng)
+        lats.append(lat)
+    return lngs, lats
+
+
+def run(args):
+    lngs, lats = random_track(args.points)
+    print(f'{args.points} points, numpy {"available" if ct.np is not None else "missing"}')
+    for name, scalar, batch, kwargs in TRANSFORMS:
+        sta = time.perf_counter()
+        expect = [scalar(x, y) for x, y in zip(lngs, lats)]
+        scalar_time = time.perf_counter() - sta
+        sta = time.perf_counter()
+        blng, blat = batch(lngs, lats, **kwargs)
+        batch_time = time.perf_counter() - sta
+        diff = sum(
+            1
+            for (x, y), bx, by in zip(expect, list(blng), list(blat))
+            if x != bx or y != by
+        )
+        print(f'{name:22s} scalar {scalar_time * 1000:8.1f}ms  batch {batch_time * 1000:8.1f}ms'
+              f'  {scalar_time / batch_time:5.1f}x  {diff} mismatches')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""Benchmark poll cycles of N simulated cars against the local stand-in api.
+
+    python -m benchmarks.bench_poll --cars 50 --cycles 10 --latency 0.1
+
+Reports poll-cycle latency, requests per second, entity writes per cycle and event-loop lag.
+Requires Home Assistant to be installed in the current environment.
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from homeassistant.core import HomeAssistant
+from homeassistant import loader
+from homeassistant.helpers import (
+    area_registry,
+    device_registry,
+    entity,
+    entity_registry,
+    restore_state,
+    translation,
+)
+from homeassistant.helpers.entity import DATA_CUSTOMIZE
+from homeassistant.helpers.entity_platform import EntityPlatform
+from homeassistant.helpers.entity_values import EntityValues
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.lixiang import (  # noqa: E402
+    DOMAIN,
+    CONF_CARS,
+    SCAN_INTERVAL,
+    init_integration_data,
+    get_car_from_config,
+)
+from custom_components.lixiang.const import *  # noqa: E402
+from benchmarks.stand_in_server import add_arguments, server_from_args  # noqa: E402
+
+# the tracker resolves addresses through a third-party geocoder, leave it out by default
+DOMAINS = ['sensor', 'binary_sensor', 'switch', 'select', 'number', 'button', 'climate', 'camera']
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes up a task sleeping `interval` seconds."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.lags = []
+        self.task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            sta = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - sta - self.interval))
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def setup_hass(args):
+    hass = HomeAssistant(tempfile.mkdtemp(prefix='lixiang-bench-'))
+    hass.config.set_time_zone('Asia/Shanghai')
+    hass.data[DATA_CUSTOMIZE] = EntityValues()
+    # the parts of bootstrap which entity platforms rely on
+    loader.async_setup(hass)
+    translation.async_setup(hass)
+    entity.async_setup(hass)
+    await area_registry.async_load(hass)
+    await device_registry.async_load(hass)
+    await entity_registry.async_load(hass)
+    await restore_state.async_load(hass)
+    init_integration_data(hass)
+    hass.data[DOMAIN]['config'] = {
+        CONF_MAX_REQUESTS: args.max_requests,
+        CONF_RATE_LIMIT: args.rate_limit,
+    }
+    await hass.async_start()
+    return hass
+
+
+def setup_platforms(hass, domains):
+    for domain in domains:
+        platform = EntityPlatform(
+            hass=hass,
+            logger=logging.getLogger(__name__),
+            domain=domain,
+            platform_name=DOMAIN,
+            platform=None,
+            scan_interval=SCAN_INTERVAL,
+            entity_namespace=None,
+        )
+        # the same callback Home Assistant hands to async_setup_entry of a platform
+        hass.data[DOMAIN]['add_entities'][domain] = platform._async_schedule_add_entities  # noqa
+
+
+def car_config(vin, base_url=None):
+    return {
+        CONF_VIN: vin,
+        CONF_API: base_url,
+        CONF_API_KEY: 'key',
+        CONF_API_SIGN: 'sign',
+        CONF_API_TOKEN: 'token',
+        CONF_DEVICE_ID: 'device',
+    }
+
+
+async def setup_cars(hass, base_url, args):
+    setup_platforms(hass, args.domains)
+    cars = []
+    for i in range(args.cars):
+        car = get_car_from_config(hass, car_config(f'LWBENCH{i:010d}', base_url))
+        await car.update_vehicle_info()
+        for domain in args.domains:
+            await car.update_hass_entities(domain)
+        cars.append(car)
+    await hass.async_block_till_done()
+    return cars
+
+
+async def run(args):
+    server = server_from_args(args)
+    base_url = await server.start()
+    hass = await setup_hass(args)
+    cars = await setup_cars(hass, base_url, args)
+    entities = sum(len(car.entities) for car in cars)
+    print(f'{len(cars)} cars, {entities} entities, stand-in api on {base_url}')
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    cycles = []
+    writes = []
+    requests = server.request_count
+    started = time.perf_counter()
+    for _ in range(args.cycles):
+        written = sum(car.write_stats['written'] for car in cars)
+        sta = time.perf_counter()
+        await asyncio.gather(*[car.update_all_status(force=not args.adaptive) for car in cars])
+        cycles.append(time.perf_counter() - sta)
+        writes.append(sum(car.write_stats['written'] for car in cars) - written)
+        if args.interval:
+            await asyncio.sleep(args.interval)
+    elapsed = time.perf_counter() - started
+    requests = server.request_count - requests
+    await monitor.stop()
+
+    print(f'poll cycle:     mean {statistics.mean(cycles) * 1000:.1f}ms'
+          f'  p95 {percentile(cycles, 0.95) * 1000:.1f}ms  max {max(cycles) * 1000:.1f}ms')
+    print(f'requests:       {requests} total, {requests / elapsed:.1f}/s')
+    print(f'entity writes:  {statistics.mean(writes):.1f} per cycle of {entities} entities')
+    print(f'event loop lag: mean {statistics.mean(monitor.lags or [0]) * 1000:.2f}ms'
+          f'  p95 {percentile(monitor.lags, 0.95) * 1000:.2f}ms  max {max(monitor.lags or [0]) * 1000:.2f}ms')
+    if args.verbose:
+        for path, cnt in sorted(server.requests.items()):
+            print(f'  {cnt:6d}  {path}')
+
+    for car in hass.data[DOMAIN][CONF_CARS].values():
+        for v in car.coordinators.values():
+            await v['coordinator'].async_shutdown()
+    await hass.async_stop(force=True)
+    await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cars', type=int, default=10)
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--interval', type=float, default=0.0, help='seconds between poll cycles')
+    parser.add_argument('--adaptive', action='store_true', help='only poll the endpoints which are due')
+    parser.add_argument('--domains', nargs='+', default=DOMAINS)
+    parser.add_argument('--max-requests', type=int, default=16)
+    parser.add_argument('--rate-limit', type=float, default=0, help='fleet-wide requests per second, 0 to disable')
+    parser.add_argument('--verbose', '-v', action='store_true')
+    add_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('homeassistant').setLevel(logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Replay recorded api traffic of many cars through the component, offline.
+
+    python -m benchmarks.bench_replay --traffic-dir /config/.storage/lixiang/traffic --speed 0
+
+Record the traffic first with `record_traffic: true` in the `lixiang` section of configuration.yaml.
+Reports replayed responses per second, entity writes and event-loop lag.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+from benchmarks.bench_poll import (
+    DOMAINS,
+    LoopLagMonitor,
+    car_config,
+    percentile,
+    setup_hass,
+    setup_platforms,
+)
+from custom_components.lixiang import DOMAIN, CONF_CARS, get_car_from_config
+from custom_components.lixiang.const import *  # noqa
+from custom_components.lixiang.traffic import TrafficReplayer
+
+
+async def run(args):
+    hass = await setup_hass(args)
+    hass.data[DOMAIN]['config'].update({
+        CONF_TRAFFIC_DIR: args.traffic_dir,
+        CONF_REPLAY_SPEED: args.speed,
+    })
+    setup_platforms(hass, args.domains)
+    vins = sorted(os.listdir(args.traffic_dir))[:args.cars or None]
+    cars = []
+    for vin in vins:
+        car = get_car_from_config(hass, car_config(vin))
+        car.replayer = TrafficReplayer(car, args.traffic_dir, args.speed)
+        for domain in args.domains:
+            await car.update_hass_entities(domain)
+        cars.append(car)
+    await hass.async_block_till_done()
+    entities = sum(len(car.entities) for car in cars)
+    print(f'{len(cars)} cars, {entities} entities, traffic from {args.traffic_dir}')
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    sta = time.perf_counter()
+    results = await asyncio.gather(*[car.replayer.async_replay() for car in cars])
+    elapsed = time.perf_counter() - sta
+    await monitor.stop()
+
+    records = sum(r['records'] for r in results)
+    applied = sum(r['applied'] for r in results)
+    written = sum(car.write_stats['written'] for car in cars)
+    skipped = sum(car.write_stats['skipped'] for car in cars)
+    print(f'replayed:       {records} records, {applied} applied in {elapsed:.1f}s, {applied / elapsed:.1f}/s')
+    print(f'entity writes:  {written} written, {skipped} skipped')
+    print(f'event loop lag: mean {statistics.mean(monitor.lags or [0]) * 1000:.2f}ms'
+          f'  p95 {percentile(monitor.lags, 0.95) * 1000:.2f}ms  max {max(monitor.lags or [0]) * 1000:.2f}ms')
+
+    for car in hass.data[DOMAIN][CONF_CARS].values():
+        for v in car.coordinators.values():
+            await v['coordinator'].async_shutdown()
+    await hass.async_stop(force=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--traffic-dir', required=True, help='directory with one sub directory of records per vin')
+    parser.add_argument('--speed', type=float, default=0, help='replay speed factor, 0 for no delay')
+    parser.add_argument('--cars', type=int, default=0, help='replay at most this many cars, 0 for all')
+    parser.add_argument('--domains', nargs='+', default=DOMAINS)
+    parser.add_argument('--max-requests', type=int, default=16)
+    parser.add_argument('--rate-limit', type=float, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('homeassistant').setLevel(logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""Local stand-in for the api-app.lixiang.com endpoints used by the component.
+
+Serves canned payloads with configurable latency and error injection:
+
+    python -m benchmarks.stand_in_server --port 8765 --latency 0.1 --error-rate 0.05
+
+Point a car at it with the `api` option, e.g. `api: http://127.0.0.1:8765`.
+It also receives forwarded locations, as traccar on `/traccar` and baidu yingyan on `/yingyan/...`.
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import time
+
+from aiohttp import web
+
+API_PREFIX = '/ssp-as-mobile-api'
+ACCOUNT_PREFIX = '/aisp-account-api'
+BASE_LAT = 39.9042
+BASE_LON = 116.4074
+
+# injected failures, as an overloaded gateway or the api itself would answer
+ERROR_REPLIES = [
+    lambda: web.Response(status=503, text='<html>Service Unavailable</html>', content_type='text/html'),
+    lambda: web.json_response({'code': 503, 'message': 'service unavailable', 'data': None}, status=503),
+    lambda: web.json_response({'code': 502, 'message': 'bad gateway', 'data': None}, status=502),
+    lambda: web.json_response(
+        {'code': 429, 'message': 'too many requests', 'data': None}, status=429, headers={'Retry-After': '1'},
+    ),
+]
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+class CarState:
+    """Simulated state of one car, advanced a little on every real-time-state request."""
+
+    def __init__(self, vin, driving=False, charging=False):
+        self.vin = vin
+        self.driving = driving
+        self.charging = charging
+        self.lat = BASE_LAT + random.uniform(-0.1, 0.1)
+        self.lon = BASE_LON + random.uniform(-0.1, 0.1)
+        self.dir = random.randint(0, 359)
+        self.mileage = random.uniform(1000, 50000)
+        self.battery = random.uniform(30, 90)
+        self.fuel = random.uniform(20, 80)
+        self.elec_energy = 160.4
+        self.updated = now_ms()
+        self.pic_timestamp = now_ms()
+
+    def advance(self):
+        tim = now_ms()
+        sec = (tim - self.updated) / 1000
+        self.updated = tim
+        if self.driving:
+            self.dir = (self.dir + random.randint(-15, 15)) % 360
+            self.lat += random.uniform(-0.0005, 0.0005)
+            self.lon += random.uniform(-0.0005, 0.0005)
+            self.mileage += sec * 0.015
+            self.battery = max(0.0, self.battery - sec * 0.002)
+        elif self.charging:
+            self.battery = min(100.0, self.battery + sec * 0.01)
+
+    def real_time_state(self):
+        tim = self.updated
+        return {
+            'vehOnlineStatus': {
+                'status': 'online' if self.driving or self.charging else 'offline',
+                'timestamp': tim,
+            },
+            'travelStatus': {'gear': 'D' if self.driving else 'P', 'timestamp': tim},
+            'chargeSetting': {
+                'timestamp': tim,
+                'chargeStatus': {'chargeStatus': 50 if self.charging else 10},
+                'enduranceStatus': {
+                    'residueBattery': round(self.battery, 1),
+                    'residueFuel': round(self.fuel, 1),
+                    'batteryEndurance': int(self.battery * 1.8),
+                    'fuelEndurance': int(self.fuel * 6),
+                },
+                'chargingFaults': [],
+                'chargingTarget': {'value': 90},
+                'batteryWarmSwitch': {'value': 0},
+            },
+            'locationStatus': {
+                'lat': round(self.lat, 6),
+                'lon': round(self.lon, 6),
+                'alt': 45,
+                'dir': self.dir,
+                'ct': tim,
+            },
+            'doorSwitchStatus': {
+                k: {'isOpen': 0, 'isLock': 1, 'actionTime': tim, 'lockTime': tim}
+                for k in ['flDoor', 'frDoor', 'rlDoor', 'rrDoor', 'tailDoor']
+            },
+            'windowSwitchStatus': {
+                k: {'openStatus': 0}
+                for k in ['flWindow', 'frWindow', 'rlWindow', 'rrWindow']
+            },
+            'temperatureStatus': {
+                'indoorTemperature': round(random.uniform(20, 24), 1),
+                'outdoorTemperature': 18,
+                'airPollutionIndex': 12,
+            },
+            'airConditioningStatus': {
+                'acOffStatus': {'value': 0},
+                'acFLTempStatus': {'value': 23.5},
+                'acWindSpeed': {'value': 3},
+            },
+            'seatStatus': {
+                'flSeatHeatVent': 0,
+                'frSeatHeatVent': 0,
+                'rlSeatHeatVent': 0,
+                'rrSeatHeatVent': 0,
+            },
+            'wheelWarmStatus': {'warmOnOff': 0},
+            'otaUpgradeInfo': {'baseVersion': '5.0.0'},
+        }
+
+    def vehicle_info(self):
+        return {
+            'vin': self.vin,
+            'vehicleNickname': f'Car {self.vin[-4:]}',
+            'plateNumber': f'京A{self.vin[-5:]}',
+            'carSeries': 'LiXiang ONE',
+            'variableModel': '2021',
+            'brand': 'LiXiang',
+        }
+
+
+class StandInServer:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, code_rate=0.0, driving=0.0, charging=0.0,
+                 error_replies=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_replies = error_replies or ERROR_REPLIES
+        self.code_rate = code_rate
+        self.driving = driving
+        self.charging = charging
+        self.cars = {}
+        self.requests = {}
+        self.received = {'traccar': [], 'baidu_yingyan': []}
+        self.receiver_down = False
+        self.receiver_status = 0
+        self.runner = None
+        self.base_url = None
+        self.app = web.Application(middlewares=[self.middleware])
+        self.app.router.add_get(API_PREFIX + '/v3-0/vehicles/{vin}/real-time-state', self.real_time_state)
+        self.app.router.add_get(API_PREFIX + '/v3-0/vehicles/energy-cost/total/{vin}', self.energy_total)
+        self.app.router.add_get(API_PREFIX + '/v3-0/vehicles/energy-cost/monthly/{year}/{month}/{vin}', self.energy_monthly)
+        self.app.router.add_get(API_PREFIX + '/v1-0/vehicles/tire/alarm/{vin}', self.tire_alarm)
+        self.app.router.add_get(API_PREFIX + '/v1-0/vehicles/{vin}/parking-photos', self.parking_photos)
+        self.app.router.add_post(API_PREFIX + '/v3-0/remote-vehicle-control/send-command', self.send_command)
+        self.app.router.add_post(API_PREFIX + '/v1-0/vehicles/svm/take-photo', self.take_photo)
+        self.app.router.add_get(ACCOUNT_PREFIX + '/v1-0/vehicles', self.vehicles)
+        self.app.router.add_get(ACCOUNT_PREFIX + '/v1-0/vehicles/{vin}', self.vehicle)
+        self.app.router.add_get('/photos/{vin}/{idx}.jpg', self.photo)
+        self.app.router.add_get('/traccar', self.traccar)
+        self.app.router.add_post('/yingyan/api/v3/track/addpoints', self.yingyan_addpoints)
+
+    def car(self, vin):
+        if vin not in self.cars:
+            roll = random.random()
+            self.cars[vin] = CarState(
+                vin,
+                driving=roll < self.driving,
+                charging=self.driving <= roll < self.driving + self.charging,
+            )
+        return self.cars[vin]
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        route = request.match_info.route.resource
+        key = route.canonical if route else request.path
+        self.requests[key] = self.requests.get(key, 0) + 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if self.error_rate and random.random() < self.error_rate:
+            return random.choice(self.error_replies)()
+        if self.code_rate and random.random() < self.code_rate and request.path.startswith(API_PREFIX):
+            return web.json_response({'code': 500001, 'message': 'injected error', 'data': None})
+        return await handler(request)
+
+    @staticmethod
+    def reply(data):
+        return web.json_response({'code': 0, 'message': 'success', 'data': data})
+
+    async def real_time_state(self, request):
+        car = self.car(request.match_info['vin'])
+        car.advance()
+        return self.reply(car.real_time_state())
+
+    async def energy_total(self, request):
+        car = self.car(request.match_info['vin'])
+        return self.reply({
+            'totalMileage': round(car.mileage, 1),
+            'elecMileage': round(car.mileage * 0.6, 1),
+            'hybridMileage': round(car.mileage * 0.4, 1),
+        })
+
+    async def energy_monthly(self, request):
+        car = self.car(request.match_info['vin'])
+        return self.reply({
+            'travelMileage': 1200.5,
+            'elecMileage': 800.2,
+            'hybridMileage': 400.3,
+            'elecEnergy': car.elec_energy,
+            'avgElecEnergy': 20.0,
+            'fuelConsumption': 30.2,
+            'avgFuelConsumption': 7.5,
+            'dailyList': [],
+        })
+
+    async def tire_alarm(self, request):
+        return self.reply({
+            'alarmCount': 0,
+            'tireAlarmState': {'flTire': 0, 'frTire': 0, 'rlTire': 0, 'rrTire': 0},
+        })
+
+    async def parking_photos(self, request):
+        car = self.car(request.match_info['vin'])
+        url = f'{self.base_url or ""}/photos/{car.vin}'
+        return self.reply({
+            'picTimestamp': car.pic_timestamp,
+            'pictures': [
+                {'photoUrl': f'{url}/{idx}.jpg?t={car.pic_timestamp}'}
+                for idx in range(4)
+            ],
+        })
+
+    async def photo(self, request):
+        from PIL import Image
+        buf = io.BytesIO()
+        idx = int(request.match_info['idx'])
+        Image.new('RGB', (640, 360), (40 * idx, 80, 160)).save(buf, 'JPEG')
+        return web.Response(body=buf.getvalue(), content_type='image/jpeg')
+
+    async def send_command(self, request):
+        return self.reply({'commandKey': (await request.json()).get('commandKey')})
+
+    async def take_photo(self, request):
+        car = self.car((await request.json()).get('vin', ''))
+        car.pic_timestamp = now_ms()
+        return self.reply({})
+
+    async def vehicles(self, request):
+        return self.reply([car.vehicle_info() for car in self.cars.values()])
+
+    async def vehicle(self, request):
+        return self.reply(self.car(request.match_info['vin']).vehicle_info())
+
+    async def traccar(self, request):
+        if self.receiver_down:
+            return web.Response(status=503)
+        if not request.query.get('id'):
+            return web.Response(status=400)
+        self.received['traccar'].append(dict(request.query))
+        return web.Response()
+
+    async def yingyan_addpoints(self, request):
+        if self.receiver_down:
+            return web.Response(status=503)
+        form = await request.post()
+        if not form.get('ak') or not form.get('service_id'):
+            return web.json_response({'status': 2, 'message': 'parameters error'})
+        if self.receiver_status:
+            return web.json_response({'status': self.receiver_status, 'message': 'injected error'})
+        points = json.loads(form.get('point_list') or '[]')
+        self.received['baidu_yingyan'].extend(points)
+        return web.json_response({'status': 0, 'message': '成功', 'success_num': len(points), 'fail_info': {}})
+
+    async def start(self, host='127.0.0.1', port=0):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # noqa
+        self.base_url = f'http://{host}:{port}'
+        return self.base_url
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    @property
+    def request_count(self):
+        return sum(self.requests.values())
+
+
+def add_arguments(parser):
+    parser.add_argument('--latency', type=float, default=0.05, help='response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.02, help='random latency jitter in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='ratio of HTTP 5xx/429 responses')
+    parser.add_argument('--code-rate', type=float, default=0.0, help='ratio of responses with a non-zero code')
+    parser.add_argument('--driving', type=float, default=0.3, help='ratio of driving cars')
+    parser.add_argument('--charging', type=float, default=0.1, help='ratio of charging cars')
+
+
+def server_from_args(args):
+    return StandInServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        code_rate=args.code_rate,
+        driving=args.driving,
+        charging=args.charging,
+    )
+
+
+async def serve(args):
+    server = server_from_args(args)
+    url = await server.start(args.host, args.port)
+    print(f'Serving LiXiang stand-in api on {url}')
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
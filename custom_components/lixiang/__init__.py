@@ -2,8 +2,10 @@
 import logging
 import asyncio
 import time
+import copy
 import json
 import uuid
+import random
 import base64
 import hashlib
 import datetime
@@ -11,25 +13,26 @@ import voluptuous as vol
 
 from homeassistant.core import HomeAssistant, SupportsResponse
 from homeassistant.const import (
+    EVENT_HOMEASSISTANT_STOP,
     SERVICE_RELOAD,
-    CONF_URL,
     CONF_ENTITIES,
     CONF_SCAN_INTERVAL,
     UnitOfLength,
     UnitOfEnergy,
     UnitOfVolume,
     UnitOfTemperature,
+    UnitOfTime,
     PERCENTAGE,
     CONCENTRATION_MICROGRAMS_PER_CUBIC_METER,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers import aiohttp_client, device_registry
+from homeassistant.helpers import device_registry
 from homeassistant.helpers.entity import Entity, EntityCategory, DeviceInfo, DATA_CUSTOMIZE
 from homeassistant.helpers.entity_component import EntityComponent
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.service import async_register_admin_service
 from homeassistant.helpers.restore_state import RestoredExtraData
-from homeassistant.helpers.storage import Store
 from homeassistant.helpers.reload import (
     async_integration_yaml_config,
     async_reload_integration_platforms,
@@ -37,13 +40,48 @@ from homeassistant.helpers.reload import (
 from homeassistant.util import dt
 import homeassistant.helpers.config_validation as cv
 from asyncio import TimeoutError
-from aiohttp import ClientConnectorError, ClientResponseError
+from aiohttp import ClientConnectionError, ClientResponseError, ClientTimeout
 
 from .const import *
+from .aggregate import RollingAggregates, window_names
+from .client import ApiMetrics, get_api_host, retry_after
+from .history import get_history_store
+from .traffic import TrafficRecorder, TrafficReplayer
+from .snapshot import SNAPSHOT_SECTIONS, get_snapshot_store
+from .trip import TripDetector
+from .webhook import HookDataView, async_ingest, payload_time, route_url
 
 _LOGGER = logging.getLogger(__name__)
 
+API_BASE = 'https://api-app.lixiang.com'
 SCAN_INTERVAL = datetime.timedelta(seconds=60)
+PARALLEL_REQUESTS = 4
+REQUEST_TIMEOUT = 15
+REQUEST_RETRIES = 2
+RETRY_BACKOFF = 1
+RETRY_BACKOFF_MAX = 30
+
+# poll intervals of each endpoint, in multiples of the scan interval, per vehicle state
+POLL_INTERVALS = {
+    'status':  {'driving': 1, 'charging': 1, 'awake': 2, 'parked': 15},
+    'mileage': {'driving': 2, 'charging': 10, 'awake': 5, 'parked': 60},
+    'tire':    {'driving': 5, 'charging': 30, 'awake': 10, 'parked': 120},
+    'photos':  {'driving': 30, 'charging': 5, 'awake': 5, 'parked': 60},
+}
+ASLEEP_STATUSES = ['offline', 'sleep', 'sleeping', 'dormant', 'hibernate']
+
+# polling is suspended while pushes arrive, and resumes slower after none for PUSH_STALE seconds
+PUSH_STALE = 600
+PUSH_FALLBACK = 3
+PUSH_CHECK_INTERVAL = datetime.timedelta(seconds=60)
+
+# ttl and stale-while-revalidate window in seconds of cacheable get apis
+CACHE_TTLS = {
+    '/aisp-account-api/v1-0/vehicles/': (86400, 86400 * 7),
+    '/vehicles/energy-cost/monthly/': (600, 3600),
+    '/vehicles/energy-cost/total/': (60, 600),
+    '/vehicles/tire/alarm/': (300, 3600),
+}
 
 DEVICE_SCHEMA = vol.Schema(
     {
@@ -53,6 +91,12 @@ DEVICE_SCHEMA = vol.Schema(
         vol.Required(CONF_API_SIGN): cv.string,
         vol.Required(CONF_API_TOKEN): cv.string,
         vol.Required(CONF_DEVICE_ID): cv.string,
+        vol.Optional(CONF_API): cv.url,
+        vol.Optional(CONF_PARALLEL_REQUESTS, default=PARALLEL_REQUESTS): cv.positive_int,
+        vol.Optional(CONF_REQUEST_TIMEOUT, default=REQUEST_TIMEOUT): cv.positive_int,
+        vol.Optional(CONF_REQUEST_RETRIES, default=REQUEST_RETRIES): cv.positive_int,
+        vol.Optional(CONF_PUSH_STALE, default=PUSH_STALE): cv.positive_int,
+        vol.Optional(CONF_PUSH_FALLBACK, default=PUSH_FALLBACK): vol.All(vol.Coerce(float), vol.Range(min=1)),
     },
     extra=vol.ALLOW_EXTRA,
 )
@@ -62,6 +106,18 @@ CONFIG_SCHEMA = vol.Schema(
         DOMAIN: vol.Schema(
             {
                 vol.Optional(CONF_CARS): vol.All(cv.ensure_list, [DEVICE_SCHEMA]),
+                vol.Optional(CONF_MAX_REQUESTS): cv.positive_int,
+                vol.Optional(CONF_RATE_LIMIT): vol.Coerce(float),
+                vol.Optional(CONF_RATE_BURST): cv.positive_int,
+                vol.Optional(CONF_RECORD_TRAFFIC, default=False): cv.boolean,
+                vol.Optional(CONF_REPLAY_TRAFFIC, default=False): cv.boolean,
+                vol.Optional(CONF_REPLAY_SPEED, default=1): vol.Coerce(float),
+                vol.Optional(CONF_TRAFFIC_DIR): cv.string,
+                vol.Optional(CONF_GEOCODE_RADIUS): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Optional(CONF_FLEET_STORE, default=False): cv.boolean,
+                vol.Optional(CONF_HISTORY, default=False): cv.boolean,
+                vol.Optional(CONF_HISTORY_DAYS): cv.positive_int,
+                vol.Optional(CONF_ENDURANCE_WINDOWS): vol.All(cv.ensure_list, [cv.positive_int]),
             },
         ),
     },
@@ -79,6 +135,8 @@ async def async_setup(hass: HomeAssistant, hass_config: dict):
     await component.async_setup(config)
 
     ComponentServices(hass)
+    if hass.http:
+        hass.http.register_view(HookDataView())
     return True
 
 
@@ -170,6 +228,58 @@ class ComponentServices:
             supports_response=SupportsResponse.OPTIONAL,
         )
 
+        hass.services.async_register(
+            DOMAIN, 'get_metrics', self.async_get_metrics,
+            schema=vol.Schema({
+                vol.Optional(CONF_VIN): cv.string,
+            }, extra=vol.ALLOW_EXTRA),
+            supports_response=SupportsResponse.ONLY,
+        )
+
+        hass.services.async_register(
+            DOMAIN, 'export_track', self.async_export_track,
+            schema=vol.Schema({
+                vol.Required(CONF_VIN): cv.string,
+                vol.Optional('start'): cv.datetime,
+                vol.Optional('end'): cv.datetime,
+                vol.Optional('format', default='geojson'): vol.In(['geojson', 'gpx']),
+                vol.Optional('coord_type', default='wgs84'): vol.In(['wgs84', 'gcj02', 'bd09']),
+            }, extra=vol.ALLOW_EXTRA),
+            supports_response=SupportsResponse.ONLY,
+        )
+
+        hass.services.async_register(
+            DOMAIN, 'get_trips', self.async_get_trips,
+            schema=vol.Schema({
+                vol.Required(CONF_VIN): cv.string,
+                vol.Optional('start'): cv.datetime,
+                vol.Optional('end'): cv.datetime,
+                vol.Optional('limit', default=50): cv.positive_int,
+            }, extra=vol.ALLOW_EXTRA),
+            supports_response=SupportsResponse.ONLY,
+        )
+
+        hass.services.async_register(
+            DOMAIN, 'query_history', self.async_query_history,
+            schema=vol.Schema({
+                vol.Optional(CONF_VIN): cv.string,
+                vol.Optional('section', default='status'): vol.In(['status', 'mileage', 'energy_cost']),
+                vol.Optional('fields', default=[]): vol.All(cv.ensure_list, [cv.string]),
+                vol.Optional('start'): cv.datetime,
+                vol.Optional('end'): cv.datetime,
+                vol.Optional('limit', default=1000): cv.positive_int,
+            }, extra=vol.ALLOW_EXTRA),
+            supports_response=SupportsResponse.ONLY,
+        )
+
+        hass.services.async_register(
+            DOMAIN, 'rebuild_aggregates', self.async_rebuild_aggregates,
+            schema=vol.Schema({
+                vol.Optional(CONF_VIN): cv.string,
+            }, extra=vol.ALLOW_EXTRA),
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
         hass.services.async_register(
             DOMAIN, 'set_hook_data', self.async_set_hook_data,
             schema=vol.Schema({
@@ -203,36 +313,96 @@ class ComponentServices:
             return {'error': 'Car not found.'}
         return await car.async_request(api, pms, headers=hds) or {}
 
-    async def async_set_hook_data(self, call):
-        lst = call.data if isinstance(call.data, list) else [call.data or {}]
-        dat = lst[0] if lst and isinstance(lst[0], dict) else {}
-        vin = dat.get(CONF_VIN)
+    async def async_get_metrics(self, call):
+        vin = call.data.get(CONF_VIN)
+        cars = self.hass.data[DOMAIN][CONF_CARS]
+        if vin and vin not in cars:
+            return {'error': 'Car not found.'}
+        return {
+            k: car.metrics_data()
+            for k, car in cars.items()
+            if not vin or k == vin
+        }
+
+    async def async_export_track(self, call):
+        vin = call.data.get(CONF_VIN)
         car = self.hass.data[DOMAIN][CONF_CARS].get(vin) if vin else None
         if not isinstance(car, BaseDevice):
             return {'error': 'Car not found.'}
-        if not (data := dict(dat.get('data') or {})):
-            return {'error': 'Empty data.'}
-        url = dat.get(CONF_URL, '')
-        now = dt.now()
-        if url.endswith(f'/aisp-account-api/v1-0/vehicles/{vin}'):
-            car.car_info = data
-        elif '/real-time-state' in url:
-            await car.update_stats(data)
-            car.car_status = data
-            await car.async_sync_store()
-        elif '/vehicles/energy-cost/total/' in url:
-            car.car_mileage = data
-        elif '/vehicles/tire/alarm/' in url:
-            car.tire_status = data
-        elif f'/vehicles/energy-cost/monthly/{now.year}/{now.month}/' in url:
-            car.energy_cost = data
-        elif f'/parking-photos' in url and data.get('pictures'):
-            car.park_photos = data
-        else:
-            return {'error': f'Unknown url: {url}'}
-        await car.update_entities()
-        await car.async_stop_pull()
-        return data
+        ent = car.entities.get(f'device_tracker.location.{vin}')
+        if not ent:
+            return {'error': 'Car has no tracker.'}
+        sta, end = [
+            int(dt.as_local(t).timestamp() * 1000) if t else None
+            for t in [call.data.get('start'), call.data.get('end')]
+        ]
+        fmt = call.data.get('format')
+        coord = call.data.get('coord_type', 'wgs84')
+        if fmt == 'gpx':
+            return {'gpx': ent.track.to_gpx(sta, end, name=car.name, coord=coord)}
+        return ent.track.to_geojson(sta, end, name=car.name, coord=coord)
+
+    async def async_get_trips(self, call):
+        vin = call.data.get(CONF_VIN)
+        car = self.hass.data[DOMAIN][CONF_CARS].get(vin) if vin else None
+        if not isinstance(car, BaseDevice):
+            return {'error': 'Car not found.'}
+        await car.trips.async_load()
+        sta, end = [
+            dt.as_local(t).timestamp() if t else None
+            for t in [call.data.get('start'), call.data.get('end')]
+        ]
+        return {
+            'trips': [
+                trip_attrs(trip)
+                for trip in car.trips.query(sta, end, call.data.get('limit'))
+            ],
+        }
+
+    async def async_query_history(self, call):
+        if not (history := get_history_store(self.hass)):
+            return {'error': 'History is not enabled.'}
+        vin = call.data.get(CONF_VIN)
+        cars = self.hass.data[DOMAIN][CONF_CARS]
+        if vin and vin not in cars:
+            return {'error': 'Car not found.'}
+        sta, end = [
+            int(dt.as_local(t).timestamp() * 1000) if t else None
+            for t in [call.data.get('start'), call.data.get('end')]
+        ]
+        fields = call.data.get('fields')
+        ret = {}
+        for k in cars:
+            if vin and k != vin:
+                continue
+            rows = await history.async_query(k, call.data['section'], fields, sta, end, call.data.get('limit'))
+            ret[k] = [
+                [dt.as_local(dt.utc_from_timestamp(row[0] / 1000)).isoformat(), *row[1:]]
+                for row in rows
+            ]
+        return {'fields': fields, 'cars': ret}
+
+    async def async_rebuild_aggregates(self, call):
+        if not get_history_store(self.hass):
+            return {'error': 'History is not enabled.'}
+        vin = call.data.get(CONF_VIN)
+        cars = self.hass.data[DOMAIN][CONF_CARS]
+        if vin and vin not in cars:
+            return {'error': 'Car not found.'}
+        ret = {}
+        for k, car in cars.items():
+            if vin and k != vin:
+                continue
+            ret[k] = await car.async_rebuild_aggregates()
+            await car.update_entities()
+        return ret
+
+    async def async_set_hook_data(self, call):
+        dat = dict(call.data or {})
+        ret = await async_ingest(self.hass, [dat])
+        if ret['errors']:
+            return {'error': ret['errors'][0]['error']}
+        return dat.get('data') or {}
 
 
 class BaseDevice:
@@ -242,15 +412,46 @@ class BaseDevice:
         self.hass = hass
         self.config = config
         self.entities = {}
-        self.listeners = {}
         self.car_info = {}
         self.car_status = {}
         self.car_mileage = {}
         self.tire_status = {}
         self.energy_cost = {}
         self.park_photos = {}
-        self.store = Store(hass, 1, f'{DOMAIN}/car-{self.vin}.json')
-        self.http = aiohttp_client.async_create_clientsession(hass, auto_cleanup=False)
+        self.store = get_snapshot_store(hass, self.vin)
+        self.api_host = get_api_host(hass, self.api_url())
+        self.http = self.api_host.session
+        self.semaphore = asyncio.Semaphore(self.get_config(CONF_PARALLEL_REQUESTS) or PARALLEL_REQUESTS)
+        self.pollers = {
+            'status': self.update_status,
+            'mileage': self.update_mileage,
+            'tire': self.update_tire_status,
+            'photos': self.update_photos,
+        }
+        self.polled_at = {}
+        self.write_stats = {'written': 0, 'skipped': 0}
+        self.inflight = {}
+        self.stale_since = None
+        self.push_times = {}
+        self.pushed_at = None
+        self.push_mode = None
+        self.push_watchdog = None
+        self.metrics = ApiMetrics(self.vin)
+        self.startup_timing = {}
+        self.trips = TripDetector(hass, self.vin)
+        self.history = get_history_store(hass)
+        self.aggregates = RollingAggregates(hass, self.vin, window_names(
+            (hass.data[DOMAIN].get('config') or {}).get(CONF_ENDURANCE_WINDOWS),
+        ))
+
+        cfg = hass.data[DOMAIN].get('config') or {}
+        self.recorder = None
+        if cfg.get(CONF_RECORD_TRAFFIC):
+            self.recorder = TrafficRecorder(hass, self.vin, cfg.get(CONF_TRAFFIC_DIR))
+            hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self.async_close_recorder)
+        self.replayer = None
+        if cfg.get(CONF_REPLAY_TRAFFIC):
+            self.replayer = TrafficReplayer(self, cfg.get(CONF_TRAFFIC_DIR), cfg.get(CONF_REPLAY_SPEED, 1))
 
         self.coordinators = {
             'status': {
@@ -278,8 +479,8 @@ class BaseDevice:
             v['coordinator'] = coordinator  # noqa
 
     def _handle_listeners(self):
-        for fun in self.listeners.values():
-            fun()
+        # keeps the coordinators scheduled, their update methods write the entities themselves
+        pass
 
     def get_adder(self, domain):
         als = self.hass.data[DOMAIN].get('add_entities') or {}
@@ -328,35 +529,173 @@ class BaseDevice:
         return device.id
 
     async def update_entities(self):
+        skipped = self.write_stats['skipped']
         for ent in self.entities.values():
             await ent.update_from_device()
+            ent._handle_coordinator_update()
+        _LOGGER.debug('%s: Skipped %s of %s entity writes, skip rate: %.1f%%', self.name,
+                      self.write_stats['skipped'] - skipped, len(self.entities), self.write_skip_rate)
 
-    async def update_all_status(self):
-        await self.update_status()
-        await self.update_mileage()
-        await self.update_tire_status()
+    @property
+    def write_skip_rate(self):
+        total = self.write_stats['written'] + self.write_stats['skipped']
+        return self.write_stats['skipped'] * 100 / total if total else 0
 
-        if dt.now().minute % 5 == 0:
-            await self.update_photos()
+    async def update_all_status(self, force=False):
+        if self.pull_suspended:
+            return
 
+        if retry_in := self.api_host.breaker.retry_in():
+            # the cloud is failing, keep the last good snapshot until the circuit closes again
+            self.stale_since = self.stale_since or dt.now()
+            self.schedule_next_poll(retry_in)
+            await self.update_entities()
+            return
+
+        now = time.monotonic()
+        state = self.vehicle_state
+        updates = {
+            k: fun()
+            for k, fun in self.pollers.items()
+            if force or now >= self.poll_due_at(k, state)
+        }
+
+        # endpoints are independent, a failed one must not drop the others
+        rets = await asyncio.gather(*updates.values(), return_exceptions=True)
+        for k, ret in zip(updates, rets):
+            if isinstance(ret, Exception):
+                _LOGGER.warning('%s: Update %s failed: %s', self.name, k, ret)
+            self.polled_at[k] = now
+
+        self.stale_since = (self.stale_since or dt.now()) if self.api_host.breaker.is_open else None
+        self.schedule_next_poll()
+        if updates:
+            await self.async_sync_store()
         await self.update_entities()
 
+    @property
+    def vehicle_state(self):
+        if self.gear not in [None, '', 'P']:
+            return 'driving'
+        if self.charge in ['charging', 'warming']:
+            return 'charging'
+        if self.ac_onoff or self.status not in ASLEEP_STATUSES:
+            return 'awake'
+        return 'parked'
+
+    def poll_interval(self, key, state=None):
+        base = self.update_interval
+        if isinstance(base, datetime.timedelta):
+            base = base.total_seconds()
+        mul = POLL_INTERVALS.get(key, {}).get(state or self.vehicle_state, 1)
+        if self.push_mode == 'fallback':
+            mul *= self.get_config(CONF_PUSH_FALLBACK) or PUSH_FALLBACK
+        return base * mul
+
+    def poll_due_at(self, key, state=None):
+        # never polled is due now, monotonic time may be small right after the host booted
+        return self.polled_at.get(key, float('-inf')) + self.poll_interval(key, state)
+
+    def schedule_next_poll(self, delay=None):
+        coordinator = self.coordinators['status'].get('coordinator')
+        if not coordinator:
+            return
+        state = self.vehicle_state
+        due = min(self.poll_due_at(k, state) for k in self.pollers)
+        sec = max(delay or due - time.monotonic(), self.poll_interval('status', 'driving'))
+        coordinator.update_interval = datetime.timedelta(seconds=sec)
+        _LOGGER.debug('%s: Next poll in %ss (%s)', self.name, round(sec), state)
+
     async def update_coordinator_first(self):
+        sta = time.monotonic()
         data = await self.store.async_load() or {}
-        if car_status := data.get('car_status'):
-            self.car_status = car_status
+        for k in SNAPSHOT_SECTIONS:
+            if data.get(k):
+                setattr(self, k, data[k])
+        self.startup_timing['snapshot'] = time.monotonic() - sta
+
+        if self.replayer:
+            await self.async_stop_pull()
+            self.replayer.start()
+            return
+
+        if not self.car_status:
+            # nothing to show yet, a failed first refresh lets the config entry retry later
+            await self.async_first_refresh(sta)
+            return
+        # entities are set up from the snapshot while the cloud is queried in the background
+        self.startup_timing['warm'] = True
+        self.startup_timing['setup'] = time.monotonic() - sta
+        self.hass.async_create_background_task(
+            self.async_first_refresh(sta), f'{DOMAIN}-{self.vin}-first-refresh',
+        )
 
-        if not self.car_info:
+    async def async_first_refresh(self, started):
+        warm = self.startup_timing.get('warm')
+        tim = time.monotonic()
+        if warm or not self.car_info:
+            # the restored vehicle info is only a placeholder, it is fetched again in the background
             await self.update_vehicle_info()
-        for v in self.coordinators.values():
-            if coo := v.get('coordinator'):
+            self.startup_timing['vehicle_info'] = time.monotonic() - tim
+        for k, v in self.coordinators.items():
+            if not (coo := v.get('coordinator')):
+                continue
+            tim = time.monotonic()
+            if warm:
+                await coo.async_refresh()
+            else:
                 await coo.async_config_entry_first_refresh()
-        await self.update_photos()
+            self.startup_timing[k] = time.monotonic() - tim
+        self.startup_timing['total'] = time.monotonic() - started
+        self.startup_timing.setdefault('setup', self.startup_timing['total'])
+        _LOGGER.info('%s: %s start in %.2fs, setup blocked %.2fs: %s', self.name, 'Warm' if warm else 'Cold',
+                     self.startup_timing['total'], self.startup_timing['setup'], ', '.join(
+                         f'{k} {v:.2f}s' for k, v in self.startup_timing.items()
+                         if k in ['snapshot', 'vehicle_info', *self.coordinators]
+                     ))
 
     async def async_sync_store(self):
-        return await self.store.async_save({
-            'car_status': self.car_status,
-        })
+        self.store.async_delay_save(self.snapshot_data)
+
+    def snapshot_data(self):
+        return {
+            k: getattr(self, k)
+            for k in SNAPSHOT_SECTIONS
+            if getattr(self, k)
+        }
+
+    async def async_close_recorder(self, *_):
+        if self.recorder:
+            await self.recorder.async_close()
+
+    async def async_set_data(self, url, data):
+        """Apply a captured or replayed api response, return False when the url is unknown."""
+        now = dt.now()
+        section, args = route_url(url)
+        if section == 'car_info' and args.get('vin') == self.vin:
+            self.car_info = data
+        elif section == 'car_status':
+            await self.update_stats(data)
+            self.car_status = data
+            self.record_history('status', data)
+            await self.update_trip()
+        elif section == 'car_mileage':
+            self.car_mileage = data
+            self.record_history('mileage', data)
+        elif section == 'tire_status':
+            self.tire_status = data
+        elif section == 'energy_cost' and [int(args['year']), int(args['month'])] == [now.year, now.month]:
+            self.energy_cost = data
+            self.record_history('energy_cost', data)
+        elif section == 'park_photos' and data.get('pictures'):
+            self.park_photos = data
+        else:
+            return False
+        return True
+
+    def section_time(self, section):
+        """Timestamp in ms of the current data of a section, from the last push or the data itself."""
+        return max(self.push_times.get(section) or 0, payload_time(section, getattr(self, section, None)) or 0)
 
     async def async_stop_pull(self):
         if not self.config.get('stop_pull'):
@@ -364,6 +703,34 @@ class BaseDevice:
                 if coordinator := v.get('coordinator'):
                     await coordinator.async_shutdown()
             self.config['stop_pull'] = True
+        if self.push_watchdog:
+            self.push_watchdog()
+            self.push_watchdog = None
+
+    @property
+    def pull_suspended(self):
+        return self.push_mode == 'push'
+
+    def on_push(self):
+        """Pushed data has arrived, suspend polling while it keeps arriving."""
+        self.pushed_at = time.time()
+        if self.config.get('stop_pull') or self.push_mode == 'push':
+            return
+        _LOGGER.info('%s: Receiving pushed data, polling suspended', self.name)
+        self.push_mode = 'push'
+        if not self.push_watchdog:
+            self.push_watchdog = async_track_time_interval(self.hass, self.check_push_stale, PUSH_CHECK_INTERVAL)
+
+    async def check_push_stale(self, *_):
+        if self.push_mode != 'push' or not self.pushed_at:
+            return
+        age = time.time() - self.pushed_at
+        if age < (self.get_config(CONF_PUSH_STALE) or PUSH_STALE):
+            return
+        _LOGGER.warning('%s: No pushed data for %ss, resume polling at a reduced rate', self.name, round(age))
+        self.push_mode = 'fallback'
+        if coordinator := self.coordinators['status'].get('coordinator'):
+            await coordinator.async_request_refresh()
 
     async def update_vehicle_info(self, vin=None):
         if vin is None:
@@ -373,6 +740,7 @@ class BaseDevice:
         api = f'/aisp-account-api/v1-0/vehicles/{vin}'
         if dat := await self.async_request(api):
             self.car_info = dat
+            await self.async_sync_store()
         return dat
 
     async def update_status(self):
@@ -380,25 +748,33 @@ class BaseDevice:
         if dat := await self.async_request(api):
             await self.update_stats(dat)
             self.car_status = dat
+            self.record_history('status', dat)
+            await self.update_trip()
         return dat
 
     async def update_mileage(self):
         api = f'/ssp-as-mobile-api/v3-0/vehicles/energy-cost/total/{self.vin}'
-        if dat := await self.async_request(api):
+        if dat := await self.async_request(api, cache=False):
             self.car_mileage = dat
+            self.record_history('mileage', dat)
         return dat
 
     async def update_tire_status(self):
         api = f'/ssp-as-mobile-api/v1-0/vehicles/tire/alarm/{self.vin}'
-        if dat := await self.async_request(api):
+        if dat := await self.async_request(api, cache=False):
             self.tire_status = dat
         return dat
 
     async def update_energy_cost(self):
+        if self.pull_suspended:
+            return self.energy_cost
         now = dt.now()
         api = f'/ssp-as-mobile-api/v3-0/vehicles/energy-cost/monthly/{now.year}/{now.month}/{self.vin}'
-        if dat := await self.async_request(api):
+        # polled hourly, a cached response within its stale window would always be one poll behind
+        if dat := await self.async_request(api, cache=False):
             self.energy_cost = dat
+            self.record_history('energy_cost', dat)
+            await self.async_sync_store()
             await self.update_entities()
         return dat
 
@@ -437,6 +813,7 @@ class BaseDevice:
         if data:
             pms['commandData'] = data
         rdt = await self.async_request(api, pms) or {}
+        self.invalidate_cache()
         if ret := rdt.get('code'):
             _LOGGER.warning('%s: Remote control failed: %s', self.name, [pms, rdt])
         return ret
@@ -568,19 +945,13 @@ class BaseDevice:
         old_time = old_endurance.get('timestamp') or 0
         if new_time <= old_time:
             return
-        stat_inc = lambda f: max(0, self.to_number(new_endurance.get(f)) - self.to_number(old_endurance.get(f)))
-        stat_dec = lambda f: max(0, self.to_number(old_endurance.get(f)) - self.to_number(new_endurance.get(f)))
-        stat = {
-            'daily_batt_consumed':  stat_dec('residueBattery'),
-            'daily_batt_recharged': stat_inc('residueBattery'),
-            'daily_batt_endurance': stat_dec('batteryEndurance'),
-            'daily_fuel_consumed':  stat_dec('residueFuel'),
-            'daily_fuel_recharged': stat_inc('residueFuel'),
-            'daily_fuel_endurance': stat_dec('fuelEndurance'),
-            'daily_cost_endurance': stat_dec('fuelEndurance') + stat_dec('batteryEndurance'),
-        }
+        stat = self.endurance_delta(new_endurance, old_endurance)
         new_date = dt.as_local(dt.utc_from_timestamp(new_time / 1000)).strftime('%Y-%m-%d')
         old_date = dt.as_local(dt.utc_from_timestamp(old_time / 1000)).strftime('%Y-%m-%d')
+        if not old_endurance:
+            stat = dict.fromkeys(stat, 0)
+        await self.aggregates.async_load()
+        self.aggregates.add(datetime.date.fromisoformat(new_date), stat)
         if new_date != old_date or not old_endurance:
             for k in stat.keys():
                 new_endurance[k] = 0
@@ -590,6 +961,101 @@ class BaseDevice:
             new_endurance[k] += v
         _LOGGER.info('update_endurance_stat: %s', [stat, new_endurance])
 
+    def endurance_delta(self, new_endurance: dict, old_endurance: dict):
+        stat_inc = lambda f: max(0, self.to_number(new_endurance.get(f), 0) - self.to_number(old_endurance.get(f), 0))
+        stat_dec = lambda f: max(0, self.to_number(old_endurance.get(f), 0) - self.to_number(new_endurance.get(f), 0))
+        return {
+            'daily_batt_consumed':  stat_dec('residueBattery'),
+            'daily_batt_recharged': stat_inc('residueBattery'),
+            'daily_batt_endurance': stat_dec('batteryEndurance'),
+            'daily_fuel_consumed':  stat_dec('residueFuel'),
+            'daily_fuel_recharged': stat_inc('residueFuel'),
+            'daily_fuel_endurance': stat_dec('fuelEndurance'),
+            'daily_cost_endurance': stat_dec('fuelEndurance') + stat_dec('batteryEndurance'),
+        }
+
+    async def async_rebuild_aggregates(self):
+        """Replay the endurance stats of the recorded history into the rolling aggregates."""
+        if not self.history:
+            return None
+        await self.aggregates.async_load()
+        fields = ['residueBattery', 'residueFuel', 'batteryEndurance', 'fuelEndurance']
+        start = dt.start_of_local_day() - datetime.timedelta(days=self.aggregates.keep - 1)
+        rows = await self.history.async_query(
+            self.vin, 'status',
+            ['chargeSetting.timestamp', *[f'chargeSetting.enduranceStatus.{f}' for f in fields]],
+            start=int(start.timestamp() * 1000),
+        )
+        self.aggregates.reset()
+        old = {}
+        for row in rows:
+            new = {**old, 'timestamp': row[1] or 0}
+            new.update({k: v for k, v in zip(fields, row[2:]) if v is not None})
+            if old and new['timestamp'] > old['timestamp']:
+                day = dt.as_local(dt.utc_from_timestamp(new['timestamp'] / 1000)).date()
+                self.aggregates.add(day, self.endurance_delta(new, old))
+            if not old or new['timestamp'] > old['timestamp']:
+                old = new
+        self.aggregates.roll(dt.now().date())
+        self.aggregates.save()
+        return len(rows)
+
+    def endurance_window_attrs(self, name):
+        return {
+            'window_days': self.aggregates.windows.get(name),
+            **self.aggregates.stat(name),
+        }
+
+    def record_history(self, section, data):
+        if self.history:
+            self.history.record(self.vin, section, data)
+
+    async def update_trip(self):
+        await self.trips.async_load()
+        loc = self.location_status
+        tracker = self.entities.get(f'device_tracker.location.{self.vin}')
+        tss = [
+            self.to_number(loc.get('ct'), 0),
+            self.to_number((self.car_status.get('travelStatus') or {}).get('timestamp'), 0),
+            self.to_number(self.charge_setting().get('timestamp'), 0),
+        ]
+        trip = self.trips.sample(
+            max(tss) / 1000,
+            self.gear,
+            lat=self.to_number(loc.get('lat')),
+            lon=self.to_number(loc.get('lon')),
+            mileage=self.mileage,
+            battery=self.battery,
+            fuel=self.fuel_level,
+            poi=tracker.extra_state_attributes.get('poi_title') if tracker else None,
+            online=self.status not in ASLEEP_STATUSES,
+        )
+        if trip:
+            _LOGGER.info('%s: Trip finished: %s', self.name, trip)
+            self.hass.bus.async_fire(f'{DOMAIN}.trip_finished', {'vin': self.vin, **trip})
+        return trip
+
+    @property
+    def last_trip_distance(self):
+        return self.trips.last.get('distance')
+
+    @property
+    def last_trip_duration(self):
+        if (dur := self.trips.last.get('duration')) is None:
+            return None
+        return round(dur / 60, 1)
+
+    @property
+    def last_trip_battery_used(self):
+        return self.trips.last.get('battery_used')
+
+    @property
+    def last_trip_fuel_used(self):
+        return self.trips.last.get('fuel_used')
+
+    def last_trip_attrs(self):
+        return trip_attrs(self.trips.last)
+
     @property
     def door_opened(self):
         cnt = 0
@@ -775,6 +1241,53 @@ class BaseDevice:
             'dailyList': self.energy_cost.get('dailyList', []),
         }
 
+    @property
+    def api_latency(self):
+        return self.metrics.latency_avg
+
+    def api_latency_attrs(self):
+        adt = {}
+        for tpl in self.metrics.paths:
+            met = self.metrics.summary(tpl)
+            adt[tpl] = {
+                k: met[k]
+                for k in ['requests', 'avg_ms', 'p95_ms', 'max_ms']
+            }
+        return adt
+
+    @property
+    def api_errors(self):
+        return self.metrics.error_count
+
+    def api_errors_attrs(self):
+        return {
+            tpl: {**met['codes'], **met['errors']}
+            for tpl, met in self.metrics.paths.items()
+            if met['codes'] or met['errors']
+        }
+
+    def metrics_data(self):
+        return {
+            'api': self.metrics.as_dict(),
+            'entity_writes': {
+                **self.write_stats,
+                'skip_rate': round(self.write_skip_rate, 1),
+            },
+            'cache': self.api_host.cache.stats,
+            'circuit_open': self.api_host.breaker.is_open,
+            'stale_since': self.stale_since.isoformat() if self.stale_since else None,
+            'vehicle_state': self.vehicle_state,
+            'push': {
+                'mode': self.push_mode,
+                'pushed_at': dt.as_local(dt.utc_from_timestamp(self.pushed_at)).isoformat() if self.pushed_at else None,
+                'section_times': self.push_times,
+            },
+            'startup': {
+                k: round(v, 3) if isinstance(v, float) else v
+                for k, v in self.startup_timing.items()
+            },
+        }
+
     @staticmethod
     def to_number(num, default=None):
         if num in [None, -2147483648, '-2147483648']:
@@ -785,6 +1298,33 @@ class BaseDevice:
             num = default
         return num
 
+    def hass_endurance_window_sensors(self):
+        from .sensor import SensorStateClass
+        dat = {}
+        for name in self.aggregates.windows:
+            dat.update({
+                f'{name}_batt_consumed': {
+                    'icon': 'mdi:battery-minus',
+                    'unit': PERCENTAGE,
+                    'state_class': SensorStateClass.MEASUREMENT,
+                    'value': lambda n=name: self.aggregates.stat(n).get('batt_consumed'),
+                },
+                f'{name}_fuel_consumed': {
+                    'icon': 'mdi:gas-station',
+                    'unit': PERCENTAGE,
+                    'state_class': SensorStateClass.MEASUREMENT,
+                    'value': lambda n=name: self.aggregates.stat(n).get('fuel_consumed'),
+                },
+                f'{name}_cost_endurance': {
+                    'icon': 'mdi:gauge',
+                    'unit': UnitOfLength.KILOMETERS,
+                    'state_class': SensorStateClass.MEASUREMENT,
+                    'value': lambda n=name: self.aggregates.stat(n).get('cost_endurance'),
+                    'attrs': lambda n=name: self.endurance_window_attrs(n),
+                },
+            })
+        return dat
+
     @property
     def hass_sensor(self):
         from .sensor import SensorStateClass
@@ -908,6 +1448,37 @@ class BaseDevice:
                 'attrs': self.monthly_fuel_attrs,
                 'state_class': SensorStateClass.TOTAL_INCREASING,
             },
+            **self.hass_endurance_window_sensors(),
+            'last_trip_distance': {
+                'icon': 'mdi:map-marker-distance',
+                'unit': UnitOfLength.KILOMETERS,
+                'attrs': self.last_trip_attrs,
+            },
+            'last_trip_duration': {
+                'icon': 'mdi:timer-outline',
+                'unit': UnitOfTime.MINUTES,
+            },
+            'last_trip_battery_used': {
+                'icon': 'mdi:battery-minus',
+                'unit': PERCENTAGE,
+            },
+            'last_trip_fuel_used': {
+                'icon': 'mdi:gas-station',
+                'unit': PERCENTAGE,
+            },
+            'api_latency': {
+                'icon': 'mdi:timer-outline',
+                'unit': UnitOfTime.MILLISECONDS,
+                'attrs': self.api_latency_attrs,
+                'category': EntityCategory.DIAGNOSTIC,
+                'state_class': SensorStateClass.MEASUREMENT,
+            },
+            'api_errors': {
+                'icon': 'mdi:cloud-alert',
+                'attrs': self.api_errors_attrs,
+                'category': EntityCategory.DIAGNOSTIC,
+                'state_class': SensorStateClass.TOTAL_INCREASING,
+            },
         }
         return dat
 
@@ -1080,14 +1651,56 @@ class BaseDevice:
     def api_url(self, api=''):
         if api[:6] == 'https:' or api[:5] == 'http:':
             return api
-        bas = 'https://api-app.lixiang.com'
+        bas = self.get_config(CONF_API) or API_BASE
         return f"{bas.rstrip('/')}/{api.lstrip('/')}"
 
     async def async_request(self, api, pms=None, **kwargs):
         uri = self.api_url(api)
         jso = json.dumps(pms, separators=(',', ':')) if pms else ''
         how = kwargs.get('method', 'POST' if pms else 'GET')
-        hds = {
+        use_cache = kwargs.pop('cache', True)
+        ttl = self.cache_ttl(how, uri)
+        # all credentials, a probe of changed options must not be answered from the cache
+        cache_key = (how, uri, jso, *[
+            self.get_config(k) for k in [CONF_API_TOKEN, CONF_API_KEY, CONF_API_SIGN, CONF_DEVICE_ID]
+        ])
+        if ttl and use_cache and (hit := self.api_host.cache.get(cache_key, *ttl)):
+            dat, fresh = hit
+            if not fresh:
+                self.hass.async_create_background_task(
+                    self.async_request(api, pms, cache=False, **kwargs),
+                    f'{DOMAIN}-{self.vin}-revalidate',
+                )
+            return copy.deepcopy(dat)
+
+        key = (how, uri, jso)
+        if flight := self.inflight.get(key):
+            # share the result of an identical request which is already in flight
+            _LOGGER.debug('%s: Join in-flight request: %s', self.name, [how, api])
+            flight['joined'] += 1
+            return copy.deepcopy(await asyncio.shield(flight['task']))
+        task = self.hass.async_create_task(self._async_request(how, uri, jso, api, pms, **kwargs))
+        flight = self.inflight[key] = {'task': task, 'joined': 0}
+        task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        dat = await asyncio.shield(task)
+        if ttl and dat:
+            self.api_host.cache.set(cache_key, copy.deepcopy(dat))
+        return copy.deepcopy(dat) if flight['joined'] else dat
+
+    @staticmethod
+    def cache_ttl(how, uri):
+        if how != 'GET':
+            return None
+        for k, v in CACHE_TTLS.items():
+            if k in uri:
+                return v
+        return None
+
+    def invalidate_cache(self):
+        self.api_host.cache.invalidate(lambda key: self.vin in key[1])
+
+    def api_headers(self, jso=''):
+        return {
             'Content-Type': 'application/json',
             'Content-Language': 'zh-CN',
             'Content-MD5': base64.b64encode(hashlib.md5(jso.encode()).digest()).decode(),
@@ -1108,18 +1721,59 @@ class BaseDevice:
             'x-chj-traceid': str(uuid.uuid4()),
             'x-chj-metadata': '{"language":"zh","code":"102004"}',
         }
-        rsp = None
-        try:
-            rsp = await self.http.request(how, uri, data=jso, headers=hds)
-            dat = await rsp.json() or {}
-        except ClientResponseError as exc:
-            dat = {}
-            if rsp:
-                txt = await rsp.text()
-                _LOGGER.error('Request api failed: %s', [api, pms, kwargs, exc, txt])
-        except (ClientConnectorError, TimeoutError) as exc:
-            dat = {}
-            _LOGGER.error('Request api failed: %s', [api, pms, kwargs, exc])
+
+    async def _async_request(self, how, uri, jso, api, pms=None, **kwargs):
+        breaker = self.api_host.breaker
+        if not breaker.allow():
+            _LOGGER.debug('%s: Circuit of %s is open, skip request: %s', self.name, self.api_host.host, api)
+            return {}
+        timeout = ClientTimeout(total=self.get_config(CONF_REQUEST_TIMEOUT) or REQUEST_TIMEOUT)
+        retries = self.get_config(CONF_REQUEST_RETRIES, REQUEST_RETRIES) if how == 'GET' else 0
+        dat = {}
+        wait = 0
+        for attempt in range(retries + 1):
+            if attempt:
+                # exponential backoff with full jitter, or as long as the server asked for
+                await asyncio.sleep(wait or random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** attempt)))
+                if not breaker.allow():
+                    break
+            rsp = None
+            sta = None
+            try:
+                async with self.semaphore, self.api_host.limit():
+                    sta = time.monotonic()
+                    rsp = await self.http.request(how, uri, data=jso, headers=self.api_headers(jso), timeout=timeout)
+                    raw = await rsp.read()
+                    if rsp.status >= 500 or rsp.status == 429:
+                        # gateways answer overload with an error status, often with a json body
+                        raise ClientResponseError(
+                            rsp.request_info, rsp.history, status=rsp.status, message=rsp.reason or '',
+                            headers=rsp.headers,
+                        )
+                    dat = await rsp.json() or {}
+                self.metrics.record(uri, time.monotonic() - sta, len(raw), dat.get('code'))
+                breaker.record_success()
+                break
+            except ClientResponseError as exc:
+                dat = {}
+                self.metrics.record(uri, sta and time.monotonic() - sta, error=f'http_{exc.status}')
+                if rsp:
+                    txt = await rsp.text()
+                    _LOGGER.error('Request api failed: %s', [api, pms, kwargs, exc, txt])
+                if exc.status < 500 and exc.status != 429:
+                    break
+                breaker.record_failure()
+                wait = retry_after(exc.headers) if exc.status == 429 else 0
+                if wait > RETRY_BACKOFF_MAX:
+                    # not worth holding the poll cycle, the next one will try again
+                    break
+            except (ClientConnectionError, TimeoutError) as exc:
+                dat = {}
+                self.metrics.record(uri, sta and time.monotonic() - sta, error=type(exc).__name__)
+                _LOGGER.error('Request api failed: %s', [api, pms, kwargs, exc, attempt])
+                breaker.record_failure()
+        if self.recorder and dat:
+            self.recorder.record(how, uri, pms, dat)
         code = dat.get('code')
         if not dat or code:
             _LOGGER.warning('Request api: %s', [api, pms, kwargs, dat])
@@ -1128,6 +1782,16 @@ class BaseDevice:
         return dat.get('data') or {}
 
 
+def trip_attrs(trip: dict):
+    if not trip:
+        return {}
+    return {
+        **trip,
+        'start': dt.as_local(dt.utc_from_timestamp(trip['start'])).isoformat(),
+        'end': dt.as_local(dt.utc_from_timestamp(trip['end'])).isoformat(),
+    }
+
+
 class BaseEntity(Entity):
     _attr_should_poll = False
 
@@ -1157,11 +1821,11 @@ class BaseEntity(Entity):
         self._attr_extra_state_attributes = {}
         self._extra_attrs = {}
         self._vars = {}
+        self._state_fingerprint = None
 
     async def async_added_to_hass(self):
         await super().async_added_to_hass()
         self.hass.data[DOMAIN][CONF_ENTITIES][self.entity_id] = self
-        self.device.listeners[self.entity_id] = self._handle_coordinator_update
 
         if hasattr(self, 'async_get_last_extra_data'):
             last: RestoredExtraData = await self.async_get_last_extra_data()
@@ -1172,6 +1836,11 @@ class BaseEntity(Entity):
                 self._attr_extra_state_attributes = data
                 self._handle_coordinator_update()
 
+        if self.device.car_status:
+            # populated from the persisted snapshot, before the first refresh of a warm start
+            await self.update_from_device()
+            self._handle_coordinator_update()
+
     @property
     def extra_restore_state_data(self):
         if self._attr_state is None:
@@ -1184,14 +1853,33 @@ class BaseEntity(Entity):
         return RestoredExtraData(data)
 
     def _handle_coordinator_update(self):
+        fpt = self.state_fingerprint()
+        if fpt is not None and fpt == self._state_fingerprint:
+            self.device.write_stats['skipped'] += 1
+            return
         self.async_write_ha_state()
+        self._state_fingerprint = fpt
+        self.device.write_stats['written'] += 1
+
+    def state_fingerprint(self):
+        try:
+            return hash(repr((
+                self.available,
+                self.state,
+                self.state_attributes,
+                self.extra_state_attributes,
+            )))
+        except Exception:  # noqa
+            return None
 
     async def async_update(self):
-        await self.device.update_all_status()
+        await self.device.update_all_status(force=True)
 
     async def update_from_device(self):
         if hasattr(self.device, self._name):
             self._attr_state = getattr(self.device, self._name)
+        elif callable(val := self._option.get('value')):
+            self._attr_state = val()
 
         fun = self._option.get('attrs')
         if callable(fun):
@@ -1203,7 +1891,13 @@ class BaseEntity(Entity):
             await self.async_set_state()
 
         self._attr_extra_state_attributes.update(self._extra_attrs)
-        self._handle_coordinator_update()
+        if self.device.stale_since:
+            self._attr_extra_state_attributes = {
+                **self._attr_extra_state_attributes,
+                'stale_since': self.device.stale_since,
+            }
+        else:
+            self._attr_extra_state_attributes.pop('stale_since', None)
         _LOGGER.debug('update_from_device: %s', [self._name, self._attr_state, self.extra_state_attributes])
 
     def get_customize(self, key=None, default=None):
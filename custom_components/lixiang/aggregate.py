@@ -0,0 +1,140 @@
+"""Rolling endurance aggregates of a car over windows of days."""
+import logging
+import collections
+import datetime
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt
+
+from .const import *
+
+_LOGGER = logging.getLogger(__name__)
+
+SAVE_DELAY = 60
+WINDOWS = {
+    'weekly': 7,
+    'monthly': 30,
+}
+STAT_KEYS = [
+    'batt_consumed',
+    'batt_recharged',
+    'batt_endurance',
+    'fuel_consumed',
+    'fuel_recharged',
+    'fuel_endurance',
+    'cost_endurance',
+]
+
+
+class RollingAggregates:
+    """Sums of the daily endurance stats over the last N days, including today.
+
+    Stats are kept in one bucket per day and a running total per window, a sample adds to its bucket
+    and the totals, and a new day subtracts the buckets which leave each window.
+    """
+
+    def __init__(self, hass: HomeAssistant, vin, windows=None):
+        self.hass = hass
+        self.vin = vin
+        self.windows = windows or WINDOWS
+        self.keep = max(self.windows.values())
+        self.store = Store(hass, 1, f'{DOMAIN}/aggregates-{vin}.json')
+        self.days = collections.OrderedDict()
+        self.totals = {k: [0.0] * len(STAT_KEYS) for k in self.windows}
+        self.today = None
+        self.loaded = False
+        self.pending = False
+
+    async def async_load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        data = await self.store.async_load() or {}
+        self.load_days(data.get('days') or {})
+
+    def load_days(self, days: dict):
+        self.days = collections.OrderedDict(sorted(days.items()))
+        self.today = None
+        self.roll(dt.now().date())
+
+    def save(self):
+        if self.pending:
+            return
+        self.pending = True
+        self.store.async_delay_save(self.data_to_save, SAVE_DELAY)
+
+    def data_to_save(self):
+        self.pending = False
+        return {'days': dict(self.days)}
+
+    def in_window(self, day: datetime.date, size):
+        return 0 <= (self.today - day).days < size
+
+    def roll(self, today: datetime.date):
+        """Move the windows to end at `today`."""
+        if self.today and today <= self.today:
+            return
+        prev, self.today = self.today, today
+        for name, size in self.windows.items():
+            if prev is None or (today - prev).days >= size:
+                self.totals[name] = self.window_sum(size)
+                continue
+            tot = self.totals[name]
+            for i in range((today - prev).days):
+                leaving = (prev - datetime.timedelta(days=size - 1 - i)).isoformat()
+                for j, v in enumerate(self.days.get(leaving) or []):
+                    tot[j] -= v
+        oldest = (today - datetime.timedelta(days=self.keep - 1)).isoformat()
+        while self.days and next(iter(self.days)) < oldest:
+            self.days.popitem(last=False)
+
+    def window_sum(self, size):
+        tot = [0.0] * len(STAT_KEYS)
+        for day, vals in self.days.items():
+            if self.in_window(datetime.date.fromisoformat(day), size):
+                for j, v in enumerate(vals):
+                    tot[j] += v
+        return tot
+
+    def add(self, day: datetime.date, stat: dict):
+        """Add the daily stat increments of one sample, keys with or without the `daily_` prefix."""
+        self.roll(day)
+        if not self.in_window(day, self.keep):
+            return
+        vals = [stat.get(f'daily_{k}', stat.get(k)) or 0 for k in STAT_KEYS]
+        if not any(vals):
+            return
+        key = day.isoformat()
+        if key not in self.days:
+            self.days[key] = [0] * len(STAT_KEYS)
+            self.days = collections.OrderedDict(sorted(self.days.items())) if day < self.today else self.days
+        bucket = self.days[key]
+        for j, v in enumerate(vals):
+            bucket[j] += v
+        for name, size in self.windows.items():
+            if self.in_window(day, size):
+                tot = self.totals[name]
+                for j, v in enumerate(vals):
+                    tot[j] += v
+        self.save()
+
+    def stat(self, name):
+        self.roll(dt.now().date())
+        return {
+            k: round(v, 2)
+            for k, v in zip(STAT_KEYS, self.totals.get(name) or [])
+        }
+
+    def reset(self):
+        self.days = collections.OrderedDict()
+        self.totals = {k: [0.0] * len(STAT_KEYS) for k in self.windows}
+        self.today = None
+
+
+def window_names(days_list):
+    """Default windows with the custom ones from the config, named like `14d`."""
+    windows = {**WINDOWS}
+    for days in days_list or []:
+        windows.setdefault(f'{days}d', days)
+    return windows
@@ -1,11 +1,14 @@
 """Support for camera."""
 import logging
+import asyncio
 import datetime
 import collections
 import io
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageDraw, ImageFont
 
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 from homeassistant.components.camera import (
     Camera as CameraEntity,
     DOMAIN as ENTITY_DOMAIN,
@@ -17,10 +20,16 @@ from . import (
     BaseEntity,
     async_setup_device,
 )
+from .photos import get_photo_cache
 
 _LOGGER = logging.getLogger(__name__)
 
 DATA_KEY = f'{ENTITY_DOMAIN}.{DOMAIN}'
+IMAGE_WORKERS = 2
+PHOTO_POSITIONS = [(0, 0), (1, 0), (1, 1), (0, 1)]
+IMAGE_QUALITY = 50
+IMAGE_CACHE_SIZE = 8
+THUMBNAIL_WIDTHS = [320, 640, 1280]
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
@@ -39,6 +48,7 @@ class CarCameraEntity(BaseEntity, CameraEntity):
         super().__init__(name, device, option)
         CameraEntity.__init__(self)
         self.access_tokens = collections.deque(self.access_tokens, 12 * 2)
+        self._image_cache = collections.OrderedDict()
 
     async def async_added_to_hass(self):
         await super().async_added_to_hass()
@@ -77,53 +87,122 @@ class CarCameraEntity(BaseEntity, CameraEntity):
             if tok not in self.access_tokens:
                 self.access_tokens.appendleft(tok)
 
+    async def async_download_photo(self, url):
+        return await get_photo_cache(self.hass).async_get(url, self.async_fetch_photo)
+
+    async def async_fetch_photo(self, url):
+        res = await self.device.http.get(url)
+        res.raise_for_status()
+        return await res.read()
+
     async def async_merge_image(self):
         pls = self.device.park_photos.get('pictures') or []
         if not pls:
             return None
-        url = pls[0]['photoUrl']
+        url = pls[0].get('photoUrl')
         if url == self._latest_url and self._latest_img:
             return self._latest_img
-        width = 1380
-        height = 720
-        target = None
-        idx = 0
-        pos = [(0, 0), (1, 0), (1, 1), (0, 1)]
-        for p in pls:
-            url = p.get('photoUrl')
-            if not url:
-                continue
-            res = await self.device.http.get(url)
-            img = Image.open(io.BytesIO(await res.read()))
-            if not target:
-                width = img.width
-                height = img.height
-                target = Image.new('RGB', (width * 2, height * 2))
-            tar = pos[idx]
-            target.paste(img, (width * tar[0], height * tar[1]))
-            idx += 1
-            if idx >= len(pos):
-                break
+        urls = [
+            p['photoUrl']
+            for p in pls
+            if p.get('photoUrl')
+        ][:len(PHOTO_POSITIONS)]
+        rets = await asyncio.gather(*[self.async_download_photo(u) for u in urls], return_exceptions=True)
+        raws = []
+        for u, ret in zip(urls, rets):
+            if isinstance(ret, Exception):
+                _LOGGER.warning('%s: Download photo failed: %s', self.name, [u, ret])
+            else:
+                raws.append(ret)
+        tim = self.device.parking_photos().get('timestamp')
+        if not isinstance(tim, datetime.date):
+            tim = datetime.datetime.now()
+        target = await async_run_image_job(self.hass, merge_photos, raws, tim.strftime('%Y-%m-%d %H:%M:%S'))
         if target:
-            draw = ImageDraw.Draw(target)
-            font = ImageFont.load_default()
-            tim = self.device.parking_photos().get('timestamp')
-            if not isinstance(tim, datetime.date):
-                tim = datetime.datetime.now()
-            draw.text((10, 10), str(tim.strftime('%Y-%m-%d %H:%M:%S')),
-                      (255, 255, 255), font=font)
+            # render the full image and thumbnails once per photo set
+            sizes = [target.size, *[fit_size(target.size, w) for w in THUMBNAIL_WIDTHS]]
+            bufs = await async_run_image_job(self.hass, render_images, target, sizes, IMAGE_QUALITY)
+            self._image_cache.clear()
+            for size, buf in bufs.items():
+                self.cache_image((url, size, IMAGE_QUALITY), buf)
             self._latest_url = url
             self._latest_img = target
         return self._latest_img
 
+    def cache_image(self, key, buf):
+        self._image_cache[key] = buf
+        self._image_cache.move_to_end(key)
+        while len(self._image_cache) > IMAGE_CACHE_SIZE:
+            self._image_cache.popitem(last=False)
+
     async def async_camera_image(self, width=None, height=None):
         """Return bytes of camera image."""
         img = await self.async_merge_image()
         if not img:
             return None
-        img = img.copy()
-        if width and height:
-            img.resize((width, height))
-        buf = io.BytesIO()
-        img.save(buf, 'JPEG', optimize=True, quality=50)
-        return buf.getvalue()
+        size = fit_size(img.size, width, height)
+        key = (self._latest_url, size, IMAGE_QUALITY)
+        if (buf := self._image_cache.get(key)) is not None:
+            self._image_cache.move_to_end(key)
+            return buf
+        buf = await async_run_image_job(self.hass, encode_image, img, size, IMAGE_QUALITY)
+        self.cache_image(key, buf)
+        return buf
+
+
+def get_image_executor(hass: HomeAssistant):
+    """Bounded pool for decoding and encoding photos, shared by all cars."""
+    if executor := hass.data[DOMAIN].get('image_executor'):
+        return executor
+    executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix=f'{DOMAIN}-image')
+    hass.data[DOMAIN]['image_executor'] = executor
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, lambda _: executor.shutdown(wait=False))
+    return executor
+
+
+async def async_run_image_job(hass: HomeAssistant, target, *args):
+    return await hass.loop.run_in_executor(get_image_executor(hass), target, *args)
+
+
+def merge_photos(raws, text=None):
+    """Decode up to four photos and paste them into a 2x2 grid, runs in the image executor."""
+    target = None
+    width = height = 0
+    for raw, pos in zip(raws, PHOTO_POSITIONS):
+        img = Image.open(io.BytesIO(raw))
+        if not target:
+            width = img.width
+            height = img.height
+            target = Image.new('RGB', (width * 2, height * 2))
+        target.paste(img, (width * pos[0], height * pos[1]))
+    if target and text:
+        draw = ImageDraw.Draw(target)
+        font = ImageFont.load_default()
+        draw.text((10, 10), text, (255, 255, 255), font=font)
+    return target
+
+
+def fit_size(size, width=None, height=None):
+    """Scale `size` down to fit into width x height, keeping the aspect ratio."""
+    w, h = size
+    scale = min(
+        width / w if width else 1,
+        height / h if height else 1,
+        1,
+    )
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+def encode_image(img, size=None, quality=IMAGE_QUALITY):
+    if size and tuple(size) != img.size:
+        img = img.resize(size, Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', optimize=True, quality=quality)
+    return buf.getvalue()
+
+
+def render_images(img, sizes, quality=IMAGE_QUALITY):
+    return {
+        size: encode_image(img, size, quality)
+        for size in dict.fromkeys(sizes)
+    }
@@ -0,0 +1,276 @@
+"""Shared HTTP client for LiXiang API hosts."""
+import logging
+import asyncio
+import collections
+import time
+import re
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import aiohttp_client
+
+from .const import *
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_REQUESTS = 16
+RATE_LIMIT = 10.0
+RATE_BURST = 20
+CACHE_SIZE = 256
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 60
+LATENCY_BUCKETS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average, and bursts of up to `burst` requests."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate or 0)
+        self.capacity = float(burst or max(self.rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            self.refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= 1
+
+
+class ResponseCache:
+    """Bounded LRU cache of API responses, each entry remembers when it was stored."""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key, ttl, stale=0):
+        """Return `(data, fresh)`, or `None` when the entry is missing or older than `ttl + stale`."""
+        ent = self.entries.get(key)
+        age = time.monotonic() - ent[0] if ent else None
+        if age is None or age >= ttl + stale:
+            self.stats['misses'] += 1
+            return None
+        self.entries.move_to_end(key)
+        fresh = age < ttl
+        self.stats['hits' if fresh else 'stale_hits'] += 1
+        return ent[1], fresh
+
+    def set(self, key, data):
+        self.entries[key] = (time.monotonic(), data)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def invalidate(self, match=None):
+        for key in list(self.entries):
+            if match is None or match(key):
+                self.entries.pop(key, None)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CircuitBreaker:
+    """Open after `threshold` consecutive failures, and let one probe through every `reset_timeout` seconds."""
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def retry_in(self):
+        if self.opened_at is None:
+            return 0
+        return max(0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        if self.retry_in() > 0:
+            return False
+        # half-open, re-arm the timer so that only one probe passes
+        self.opened_at = time.monotonic()
+        return True
+
+    def record_success(self):
+        if self.opened_at is not None:
+            _LOGGER.info('Circuit of %s closed', self.name)
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures < self.threshold:
+            return
+        if self.opened_at is None:
+            _LOGGER.warning('Circuit of %s opened after %s failures', self.name, self.failures)
+        self.opened_at = time.monotonic()
+
+
+class ApiMetrics:
+    """Latency histograms, response sizes, error codes and transport errors per api path template."""
+
+    def __init__(self, vin=None):
+        self.vin = vin
+        self.paths = {}
+        self.templates = {}
+
+    def template(self, api):
+        if api in self.templates:
+            return self.templates[api]
+        path = urlparse(api).path or api
+        if self.vin:
+            path = path.replace(self.vin, '{vin}')
+        tpl = re.sub(r'/\d+(?=/|$)', '/{n}', path)
+        self.templates[api] = tpl
+        return tpl
+
+    def record(self, api, latency=None, size=0, code=None, error=None):
+        tpl = self.template(api)
+        met = self.paths.get(tpl)
+        if met is None:
+            met = self.paths[tpl] = {
+                'requests': 0,
+                'latency_sum': 0,
+                'latency_max': 0,
+                'latency_hist': [0] * (len(LATENCY_BUCKETS) + 1),
+                'bytes': 0,
+                'codes': {},
+                'errors': {},
+            }
+        met['requests'] += 1
+        if latency is not None:
+            ms = latency * 1000
+            met['latency_sum'] += ms
+            met['latency_max'] = max(met['latency_max'], ms)
+            idx = len(LATENCY_BUCKETS)
+            for i, b in enumerate(LATENCY_BUCKETS):
+                if ms <= b:
+                    idx = i
+                    break
+            met['latency_hist'][idx] += 1
+        met['bytes'] += size or 0
+        if code:
+            met['codes'][str(code)] = met['codes'].get(str(code), 0) + 1
+        if error:
+            met['errors'][error] = met['errors'].get(error, 0) + 1
+
+    @staticmethod
+    def percentile(hist, pct, overflow=None):
+        total = sum(hist)
+        if not total:
+            return None
+        cnt = 0
+        for i, n in enumerate(hist):
+            cnt += n
+            if cnt >= total * pct:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else overflow
+        return None
+
+    def summary(self, tpl):
+        met = self.paths[tpl]
+        timed = sum(met['latency_hist'])
+        return {
+            'requests': met['requests'],
+            'avg_ms': round(met['latency_sum'] / timed, 1) if timed else None,
+            'p95_ms': self.percentile(met['latency_hist'], 0.95, round(met['latency_max'], 1)),
+            'max_ms': round(met['latency_max'], 1),
+            'avg_bytes': round(met['bytes'] / met['requests']),
+            'codes': sum(met['codes'].values()),
+            'errors': sum(met['errors'].values()),
+        }
+
+    @property
+    def latency_avg(self):
+        num = sum(sum(m['latency_hist']) for m in self.paths.values())
+        if not num:
+            return None
+        return round(sum(m['latency_sum'] for m in self.paths.values()) / num, 1)
+
+    @property
+    def error_count(self):
+        return sum(
+            sum(m['codes'].values()) + sum(m['errors'].values())
+            for m in self.paths.values()
+        )
+
+    def as_dict(self):
+        return {
+            tpl: {
+                **self.summary(tpl),
+                'latency_buckets': dict(zip([*map(str, LATENCY_BUCKETS), 'inf'], met['latency_hist'])),
+                'bytes': met['bytes'],
+                'codes': dict(met['codes']),
+                'errors': dict(met['errors']),
+            }
+            for tpl, met in self.paths.items()
+        }
+
+
+def retry_after(headers):
+    """Seconds to wait from the `Retry-After` header, in seconds or as an http date, or 0."""
+    val = (headers or {}).get('Retry-After')
+    if not val:
+        return 0
+    try:
+        return max(0.0, float(val))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(val).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0
+
+
+class ApiHost:
+    """One pooled keep-alive session per API host, shared by all cars."""
+
+    def __init__(self, hass: HomeAssistant, host, config=None):
+        cfg = config or {}
+        self.hass = hass
+        self.host = host
+        self.session = aiohttp_client.async_create_clientsession(hass)
+        self.semaphore = asyncio.Semaphore(cfg.get(CONF_MAX_REQUESTS) or MAX_REQUESTS)
+        self.bucket = TokenBucket(
+            cfg.get(CONF_RATE_LIMIT, RATE_LIMIT),
+            cfg.get(CONF_RATE_BURST, RATE_BURST),
+        )
+        self.cache = ResponseCache()
+        self.breaker = CircuitBreaker(host)
+
+    @asynccontextmanager
+    async def limit(self):
+        await self.bucket.acquire()
+        async with self.semaphore:
+            yield
+
+
+def get_api_host(hass: HomeAssistant, url) -> ApiHost:
+    host = urlparse(url).netloc or url
+    hosts = hass.data[DOMAIN].setdefault('api_hosts', {})
+    if host not in hosts:
+        hosts[host] = ApiHost(hass, host, hass.data[DOMAIN].get('config'))
+        _LOGGER.debug('New api host: %s', host)
+    return hosts[host]
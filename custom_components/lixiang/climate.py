@@ -44,9 +44,9 @@ class CarAcEntity(XClimateEntity):
     _attr_supported_features = ClimateEntityFeature(0)
 
     async def async_added_to_hass(self):
-        await super().async_added_to_hass()
         self._attr_supported_features |= ClimateEntityFeature.TARGET_TEMPERATURE
         self._attr_supported_features |= ClimateEntityFeature.FAN_MODE
+        await super().async_added_to_hass()
 
     @property
     def ac_status(self):
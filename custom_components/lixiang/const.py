@@ -12,6 +12,23 @@ CONF_CARS = 'cars'
 CONF_VIN = 'vin'
 CONF_API = 'api'
 CONF_API_SIGN = 'api_sign'
+CONF_PARALLEL_REQUESTS = 'parallel_requests'
+CONF_REQUEST_TIMEOUT = 'request_timeout'
+CONF_REQUEST_RETRIES = 'request_retries'
+CONF_MAX_REQUESTS = 'max_requests'
+CONF_RATE_LIMIT = 'rate_limit'
+CONF_RATE_BURST = 'rate_burst'
+CONF_RECORD_TRAFFIC = 'record_traffic'
+CONF_REPLAY_TRAFFIC = 'replay_traffic'
+CONF_REPLAY_SPEED = 'replay_speed'
+CONF_TRAFFIC_DIR = 'traffic_dir'
+CONF_GEOCODE_RADIUS = 'geocode_radius'
+CONF_FLEET_STORE = 'fleet_store'
+CONF_HISTORY = 'history'
+CONF_HISTORY_DAYS = 'history_days'
+CONF_ENDURANCE_WINDOWS = 'endurance_windows'
+CONF_PUSH_STALE = 'push_stale'
+CONF_PUSH_FALLBACK = 'push_fallback'
 
 SUPPORTED_DOMAINS = [
     'binary_sensor',
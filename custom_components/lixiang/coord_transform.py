@@ -4,6 +4,11 @@ https://github.com/wandergis/coordTransform_py/blob/master/coordTransform_utils.
 import math
 from math import pi
 
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
 a = 6378245.0  # 长半轴
 ee = 0.00669342162296594323  # 偏心率平方
 x_pi = pi * 3000.0 / 180.0
@@ -121,3 +126,164 @@ def _transformlng(lng, lat):
 
 def out_of_china(lng, lat):
     return not (73.66 < lng < 135.05 and 3.86 < lat < 53.55)
+
+
+def gcj02_to_wgs84_exact(lng, lat, threshold=1e-9, max_iter=30):
+    """
+    GCJ02转WGS84(迭代求精)，误差小于threshold度
+    :param lng:火星坐标系的经度
+    :param lat:火星坐标系纬度
+    :return:原始坐标
+    """
+    if out_of_china(lng, lat):
+        return [lng, lat]
+    wlng, wlat = lng, lat
+    for _ in range(max_iter):
+        dlng, dlat = _delta(wlng, wlat)
+        elng = lng - (wlng + dlng)
+        elat = lat - (wlat + dlat)
+        wlng += elng
+        wlat += elat
+        if abs(elng) < threshold and abs(elat) < threshold:
+            break
+    return [wlng, wlat]
+
+
+def _delta(lng, lat):
+    dlat = _transformlat(lng - 105.0, lat - 35.0)
+    dlng = _transformlng(lng - 105.0, lat - 35.0)
+    radlat = lat / 180.0 * pi
+    magic = math.sin(radlat)
+    magic = 1 - ee * magic * magic
+    sqrtmagic = math.sqrt(magic)
+    dlat = (dlat * 180.0) / ((a * (1 - ee)) / (magic * sqrtmagic) * pi)
+    dlng = (dlng * 180.0) / (a / sqrtmagic * math.cos(radlat) * pi)
+    return dlng, dlat
+
+
+"""
+批量转换，输入经纬度数组，返回(经度数组, 纬度数组)
+安装了numpy时向量化计算，否则逐点调用上面的函数
+"""
+
+
+def out_of_china_batch(lng, lat):
+    if np is None:
+        return [out_of_china(x, y) for x, y in zip(lng, lat)]
+    lng = np.asarray(lng, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    return ~((73.66 < lng) & (lng < 135.05) & (3.86 < lat) & (lat < 53.55))
+
+
+def wgs84_to_gcj02_batch(lng, lat):
+    if np is None:
+        return _scalar_batch(wgs84_to_gcj02, lng, lat)
+    lng, lat = _arrays(lng, lat)
+    dlng, dlat = _delta_batch(lng, lat)
+    out = out_of_china_batch(lng, lat)
+    return (
+        np.where(out, lng, _round7(lng + dlng)),
+        np.where(out, lat, _round7(lat + dlat)),
+    )
+
+
+def gcj02_to_wgs84_batch(lng, lat, exact=False, threshold=1e-9, max_iter=30):
+    if np is None:
+        fun = gcj02_to_wgs84_exact if exact else gcj02_to_wgs84
+        return _scalar_batch(fun, lng, lat)
+    lng, lat = _arrays(lng, lat)
+    out = out_of_china_batch(lng, lat)
+    if not exact:
+        dlng, dlat = _delta_batch(lng, lat)
+        return (
+            np.where(out, lng, lng * 2 - (lng + dlng)),
+            np.where(out, lat, lat * 2 - (lat + dlat)),
+        )
+    wlng, wlat = lng.copy(), lat.copy()
+    todo = ~out
+    for _ in range(max_iter):
+        if not todo.any():
+            break
+        dlng, dlat = _delta_batch(wlng[todo], wlat[todo])
+        elng = lng[todo] - (wlng[todo] + dlng)
+        elat = lat[todo] - (wlat[todo] + dlat)
+        wlng[todo] += elng
+        wlat[todo] += elat
+        # converged points are left alone, as the scalar loop stops for each of them
+        done = (np.abs(elng) < threshold) & (np.abs(elat) < threshold)
+        todo[np.flatnonzero(todo)[done]] = False
+    return wlng, wlat
+
+
+def gcj02_to_bd09_batch(lng, lat):
+    if np is None:
+        return _scalar_batch(gcj02_to_bd09, lng, lat)
+    lng, lat = _arrays(lng, lat)
+    z = np.sqrt(lng * lng + lat * lat) + 0.00002 * np.sin(lat * x_pi)
+    theta = _atan2(lat, lng) + 0.000003 * np.cos(lng * x_pi)
+    return z * np.cos(theta) + 0.0065, z * np.sin(theta) + 0.006
+
+
+def bd09_to_gcj02_batch(bd_lon, bd_lat):
+    if np is None:
+        return _scalar_batch(bd09_to_gcj02, bd_lon, bd_lat)
+    x, y = _arrays(bd_lon, bd_lat)
+    x = x - 0.0065
+    y = y - 0.006
+    z = np.sqrt(x * x + y * y) - 0.00002 * np.sin(y * x_pi)
+    theta = _atan2(y, x) - 0.000003 * np.cos(x * x_pi)
+    return z * np.cos(theta), z * np.sin(theta)
+
+
+def wgs84_to_bd09_batch(lng, lat):
+    return gcj02_to_bd09_batch(*wgs84_to_gcj02_batch(lng, lat))
+
+
+def bd09_to_wgs84_batch(bd_lon, bd_lat, exact=False):
+    return gcj02_to_wgs84_batch(*bd09_to_gcj02_batch(bd_lon, bd_lat), exact=exact)
+
+
+def _atan2(y, x):
+    # np.arctan2 may differ from math.atan2 in the last bit, keep the batch results identical
+    return np.frompyfunc(math.atan2, 2, 1)(y, x).astype(float)
+
+
+def _arrays(lng, lat):
+    return np.array(lng, dtype=float), np.array(lat, dtype=float)
+
+
+def _scalar_batch(fun, lng, lat):
+    pts = [fun(x, y) for x, y in zip(lng, lat)]
+    return [p[0] for p in pts], [p[1] for p in pts]
+
+
+def _round7(val):
+    out = np.round(val, 7)
+    # np.round scales by 10**7 first, which may pick the other side of a near tie than python's round()
+    frac = np.abs(val * 1e7 % 1 - 0.5)
+    for i in np.flatnonzero(frac < 1e-6):
+        out[i] = round(float(val[i]), 7)
+    return out
+
+
+def _delta_batch(lng, lat):
+    x = lng - 105.0
+    y = lat - 35.0
+    sqrt_x = np.sqrt(np.abs(x))
+    sin_6x = np.sin(6.0 * x * pi)
+    sin_2x = np.sin(2.0 * x * pi)
+    dlat = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * sqrt_x
+    dlat += (20.0 * sin_6x + 20.0 * sin_2x) * 2.0 / 3.0
+    dlat += (20.0 * np.sin(y * pi) + 40.0 * np.sin(y / 3.0 * pi)) * 2.0 / 3.0
+    dlat += (160.0 * np.sin(y / 12.0 * pi) + 320 * np.sin(y * pi / 30.0)) * 2.0 / 3.0
+    dlng = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * sqrt_x
+    dlng += (20.0 * sin_6x + 20.0 * sin_2x) * 2.0 / 3.0
+    dlng += (20.0 * np.sin(x * pi) + 40.0 * np.sin(x / 3.0 * pi)) * 2.0 / 3.0
+    dlng += (150.0 * np.sin(x / 12.0 * pi) + 300.0 * np.sin(x / 30.0 * pi)) * 2.0 / 3.0
+    radlat = lat / 180.0 * pi
+    magic = np.sin(radlat)
+    magic = 1 - ee * magic * magic
+    sqrtmagic = np.sqrt(magic)
+    dlat = (dlat * 180.0) / ((a * (1 - ee)) / (magic * sqrtmagic) * pi)
+    dlng = (dlng * 180.0) / (a / sqrtmagic * np.cos(radlat) * pi)
+    return dlng, dlat
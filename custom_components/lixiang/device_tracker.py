@@ -1,7 +1,6 @@
 """Support for device tracker."""
 import logging
 import aiohttp
-import json
 from math import sin, asin, cos, radians, fabs, sqrt
 
 from homeassistant.components.device_tracker.config_entry import (
@@ -9,6 +8,7 @@ from homeassistant.components.device_tracker.config_entry import (
     DOMAIN as ENTITY_DOMAIN,
 )
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
 from aiohttp.client_exceptions import ClientConnectorError
 
 from . import (
@@ -17,12 +17,16 @@ from . import (
     async_setup_device,
 )
 from .coord_transform import wgs84_to_gcj02
+from .forwarder import TraccarForwarder, YingyanForwarder
+from .geocode import compact_geocode, get_geocode_cache
+from .track import TrackBuffer
 
 _LOGGER = logging.getLogger(__name__)
 
 DATA_KEY = f'{ENTITY_DOMAIN}.{DOMAIN}'
 EARTH_RADIUS = 6371
 KNOTS_TO_KPH_RATIO = 0.539957
+TRACK_SAVE_DELAY = 300
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
@@ -36,6 +40,28 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
 class CarTrackerEntity(BaseEntity, TrackerEntity):
     _prev_updated = None
     _prev_location = None
+    _geocode_point = None
+    _geocode_task = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._forwarders = {}
+        self.track = TrackBuffer()
+        self._track_store = Store(self.hass, 1, f'{DOMAIN}/track-{self.device.vin}.json')
+
+    async def async_added_to_hass(self):
+        self.track.load(await self._track_store.async_load())
+        await super().async_added_to_hass()
+        # resume sending the points spooled before a restart
+        self.traccar_forwarder()
+        self.yingyan_forwarder()
+
+    async def async_will_remove_from_hass(self):
+        await super().async_will_remove_from_hass()
+        if self._geocode_task:
+            self._geocode_task.cancel()
+        for fwd in self._forwarders.values():
+            fwd.stop()
 
     async def async_set_state(self):
         tim = self.updated_at
@@ -48,28 +74,73 @@ class CarTrackerEntity(BaseEntity, TrackerEntity):
         if location_updated:
             lng, lat = wgs84_to_gcj02(self.longitude, self.latitude)
             self._extra_attrs['gcj02_location'] = f'{lat},{lng}'
-
-            geo = await self.qq_geocoder(f'{lat},{lng}')
-            if geo and (pois := geo.get('pois')):
-                poi = pois[0]
-                adr = geo.get('address', '')
-                self._extra_attrs.update({
-                    'poi_title': ' '.join([adr, poi.get('title', '')]).strip(),
-                    'address': poi.get('address') or adr,
-                    **(poi.get('ad_info') or {}),
-                })
-            self.hass.bus.fire(f'{DOMAIN}.location_updated', {
-                'vin': self.device.vin,
-                **self.state_attributes,
-                **self.extra_state_attributes,
-            })
-
             if spd := self.get_speed():
                 self._extra_attrs['speed'] = spd
             self._prev_updated = tim
             self._prev_location = point
-            await self.update_to_traccar()
-            await self.update_to_baidu_yingyan()
+            if tim and self.latitude is not None and self.longitude is not None:
+                self.track.append(
+                    self.latitude, self.longitude,
+                    alt=self.device.to_number(self.location_status.get('alt'), 0),
+                    dir=self.device.to_number(self.location_status.get('dir'), 0),
+                    ct=int(tim * 1000),
+                    speed=spd or 0,
+                )
+                self._track_store.async_delay_save(self.track.as_dict, TRACK_SAVE_DELAY)
+
+            # only cached addresses resolve inline, the geocoder is left to a background worker
+            if geo := await get_geocode_cache(self.hass).async_get(lat, lng):
+                self.set_geocode(geo)
+                self.fire_location_updated()
+            else:
+                self.queue_geocode(lat, lng)
+            self.update_to_traccar()
+            self.update_to_baidu_yingyan()
+
+    def set_geocode(self, geo):
+        if not geo or not (pois := geo.get('pois')):
+            return
+        poi = pois[0]
+        adr = geo.get('address', '')
+        self._extra_attrs.update({
+            'poi_title': ' '.join([adr, poi.get('title', '')]).strip(),
+            'address': poi.get('address') or adr,
+            **(poi.get('ad_info') or {}),
+        })
+
+    def fire_location_updated(self):
+        self.hass.bus.async_fire(f'{DOMAIN}.location_updated', {
+            'vin': self.device.vin,
+            **self.state_attributes,
+            **self.extra_state_attributes,
+            **self._extra_attrs,
+        })
+
+    def queue_geocode(self, lat, lng):
+        """Geocode the point in the background, a point still waiting is replaced by the newer one."""
+        self._geocode_point = (lat, lng)
+        if not self._geocode_task:
+            self._geocode_task = self.hass.async_create_background_task(
+                self.async_geocode_worker(), f'{DOMAIN}-{self.device.vin}-geocode',
+            )
+
+    async def async_geocode_worker(self):
+        try:
+            while point := self._geocode_point:
+                geo = await self.async_geocode(*point)
+                if point != self._geocode_point:
+                    continue
+                self._geocode_point = None
+                self.set_geocode(geo)
+                self._attr_extra_state_attributes = {
+                    **self._attr_extra_state_attributes,
+                    **self._extra_attrs,
+                }
+                self.fire_location_updated()
+                if self.platform:
+                    self._handle_coordinator_update()
+        finally:
+            self._geocode_task = None
 
     @property
     def battery_level(self):
@@ -117,10 +188,29 @@ class CarTrackerEntity(BaseEntity, TrackerEntity):
                 return spd
         return None
 
-    async def update_to_traccar(self):
+    def get_forwarder(self, cls, **config):
+        if not (fwd := self._forwarders.get(cls.name)):
+            fwd = self._forwarders[cls.name] = cls(self.hass, self.device.vin, **config)
+            self.hass.async_create_task(fwd.async_start())
+        fwd.config.update(config)
+        return fwd
+
+    def traccar_forwarder(self):
         host = self.get_customize('traccar_host')
+        if not host:
+            return None
+        return self.get_forwarder(TraccarForwarder, host=host)
+
+    def yingyan_forwarder(self):
+        key = self.get_customize('baidu_yingyan_key')
+        sid = self.get_customize('baidu_yingyan_sid')
+        if not key or not sid:
+            return None
+        return self.get_forwarder(YingyanForwarder, key=key, sid=sid)
+
+    def update_to_traccar(self):
         did = self.get_customize('traccar_did') or self.device.vin
-        if not host or not did:
+        if not did or not (fwd := self.traccar_forwarder()):
             return None
         # https://github.com/traccar/traccar/blob/master/src/main/java/org/traccar/protocol/OsmAndProtocolDecoder.java
         # https://github.com/traccar/traccar/blob/master/src/main/java/org/traccar/model/Position.java
@@ -132,7 +222,7 @@ class CarTrackerEntity(BaseEntity, TrackerEntity):
             'lon': self.longitude,
             'altitude': self.location_status.get('alt'),
             'heading': self.location_status.get('dir'),
-            'speed': self.extra_state_attributes.get('speed', 0) * KNOTS_TO_KPH_RATIO,  # km/h -> knots
+            'speed': self._extra_attrs.get('speed', 0) * KNOTS_TO_KPH_RATIO,  # km/h -> knots
             'batt': self.battery_level,
             'fuel': self.device.to_number(self.device.endurance_attrs().get('residueFuel')),
             'deviceTemp': self.device.indoor_temperature,
@@ -145,39 +235,41 @@ class CarTrackerEntity(BaseEntity, TrackerEntity):
             for k, v in pms.items()
             if v is not None
         }
-        url = host if '://' in host else f'http://{host}'
-        try:
-            await self.device.http.get(url, params=pms)
-        except (ClientConnectorError, Exception) as exc:
-            _LOGGER.warning('Update to traccar: %s', [pms, exc])
+        fwd.push(pms)
 
-    async def update_to_baidu_yingyan(self):
-        key = self.get_customize('baidu_yingyan_key')
-        sid = self.get_customize('baidu_yingyan_sid')
-        if not key or not sid:
+    def update_to_baidu_yingyan(self):
+        if not (fwd := self.yingyan_forwarder()):
             return None
+        # https://lbsyun.baidu.com/faq/api?title=yingyan/api/v3/trackupload
         pms = {
-            'ak': key,
-            'service_id': sid,
             'entity_name': self.device.vin,
             'latitude': self.latitude,
             'longitude': self.longitude,
             'loc_time': int(self.updated_at),
             'height': self.location_status.get('alt'),
             'direction': int(self.location_status.get('dir', 0)),
-            'speed': self.extra_state_attributes.get('speed', 0),
+            'speed': self._extra_attrs.get('speed', 0),
             'coord_type_input': 'wgs84',
         }
-        url = 'https://yingyan.baidu.com/api/v3/track/addpoint'
-        jss = None
+        fwd.push({
+            k: v
+            for k, v in pms.items()
+            if v is not None
+        })
+
+    async def async_geocode(self, lat, lng):
+        cache = get_geocode_cache(self.hass)
+        if geo := await cache.async_get(lat, lng):
+            return geo
         try:
-            res = await self.device.http.post(url, data=pms)
-            jss = await res.text()
-            rdt = json.loads(jss) or {}
-            if not rdt or rdt.get('status'):
-                _LOGGER.warning('Update to baidu yingyan: %s', [pms, jss])
+            geo = await self.qq_geocoder(f'{lat},{lng}')
         except (ClientConnectorError, Exception) as exc:
-            _LOGGER.warning('Update to baidu yingyan: %s', [pms, jss, exc])
+            _LOGGER.warning('Reverse geocoding failed: %s', [lat, lng, exc])
+            return None
+        if geo and geo.get('pois'):
+            geo = compact_geocode(geo)
+            await cache.async_set(lat, lng, geo)
+        return geo
 
     async def qq_geocoder(self, location=None):
         res = await async_get_clientsession(self.hass).get(
@@ -0,0 +1,164 @@
+"""Forward tracker locations to third-party services."""
+import logging
+import asyncio
+import collections
+import json
+import random
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+
+from .const import *
+
+_LOGGER = logging.getLogger(__name__)
+
+SPOOL_POINTS = 10000
+SAVE_DELAY = 10
+SEND_TIMEOUT = 15
+RETRY_BACKOFF = 2
+RETRY_BACKOFF_MAX = 300
+MAX_RETRIES = 20
+# status of baidu yingyan: internal error, daily quota exceeded, concurrency limit exceeded
+YINGYAN_TRANSIENT = [1, 302, 401]
+
+
+class ForwardError(Exception):
+    """The target answered but rejected the points, sending them again would not help."""
+
+
+class TransientForwardError(ForwardError):
+    """The target can not take the points for now, they are sent again later."""
+
+
+def is_transient(exc):
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status >= 500 or exc.status == 429
+    return isinstance(exc, (TransientForwardError, aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class Forwarder:
+    """Queue of points for one target of a car, spooled to disk until the target accepts them."""
+
+    name = None
+    batch_size = 1
+
+    def __init__(self, hass: HomeAssistant, vin, max_points=SPOOL_POINTS, **config):
+        self.hass = hass
+        self.vin = vin
+        self.config = config
+        self.http = async_get_clientsession(hass)
+        self.store = Store(hass, 1, f'{DOMAIN}/forward/{vin}.{self.name}.json')
+        self.points = collections.deque(maxlen=max_points)
+        self.event = asyncio.Event()
+        self.task = None
+        self.failures = 0
+        self.stats = {'sent': 0, 'rejected': 0, 'dropped': 0, 'retries': 0, 'abandoned': 0}
+
+    async def async_start(self):
+        if self.task:
+            return
+        data = await self.store.async_load() or {}
+        if spooled := data.get('points'):
+            # points queued while loading are newer than the spooled ones
+            self.points.extendleft(reversed(spooled[-self.points.maxlen:]))
+            self.event.set()
+            _LOGGER.info('%s: Resume forwarding %s spooled points to %s', self.vin, len(spooled), self.name)
+        self.task = self.hass.async_create_background_task(self.async_run(), f'{DOMAIN}-{self.vin}-{self.name}')
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def push(self, point, **config):
+        self.config.update(config)
+        if len(self.points) == self.points.maxlen:
+            self.stats['dropped'] += 1
+        self.points.append(point)
+        self.save()
+        self.event.set()
+
+    def save(self):
+        self.store.async_delay_save(lambda: {'points': list(self.points)}, SAVE_DELAY)
+
+    @property
+    def pending(self):
+        return len(self.points)
+
+    async def async_run(self):
+        while True:
+            if not self.points:
+                self.event.clear()
+                await self.event.wait()
+                continue
+            batch = [self.points[i] for i in range(min(self.batch_size, len(self.points)))]
+            try:
+                await self.async_send(batch)
+                self.stats['sent'] += len(batch)
+                self.failures = 0
+            except (ForwardError, aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exc:
+                if not is_transient(exc):
+                    # a request the target refuses or answers with garbage must not block the queue
+                    self.stats['rejected'] += len(batch)
+                    _LOGGER.warning('%s: Forward to %s rejected: %s', self.vin, self.name, [exc, batch])
+                elif self.failures >= MAX_RETRIES:
+                    self.stats['abandoned'] += len(batch)
+                    _LOGGER.warning('%s: Forward to %s failed %s times, drop %s points: %s',
+                                    self.vin, self.name, self.failures + 1, len(batch), exc)
+                else:
+                    self.failures += 1
+                    self.stats['retries'] += 1
+                    delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** self.failures))
+                    _LOGGER.info('%s: Forward to %s failed, %s points pending, retry in %.1fs: %s',
+                                 self.vin, self.name, len(self.points), delay, exc)
+                    await asyncio.sleep(delay)
+                    continue
+                self.failures = 0
+            # points may have been dropped from the left of a full queue while sending
+            for point in batch:
+                if self.points and self.points[0] is point:
+                    self.points.popleft()
+            self.save()
+
+    async def async_send(self, points):
+        raise NotImplementedError()
+
+
+class TraccarForwarder(Forwarder):
+    """OsmAnd protocol of traccar, one point per request."""
+
+    name = 'traccar'
+
+    async def async_send(self, points):
+        host = self.config.get('host')
+        url = host if '://' in host else f'http://{host}'
+        for pms in points:
+            async with self.http.get(url, params=pms, timeout=aiohttp.ClientTimeout(total=SEND_TIMEOUT)) as res:
+                if res.status >= 400:
+                    raise aiohttp.ClientResponseError(res.request_info, res.history, status=res.status)
+
+
+class YingyanForwarder(Forwarder):
+    """Baidu yingyan accepts up to 100 points in one addpoints request."""
+
+    name = 'baidu_yingyan'
+    batch_size = 100
+    api = 'https://yingyan.baidu.com/api/v3/track/addpoints'
+
+    async def async_send(self, points):
+        pms = {
+            'ak': self.config.get('key'),
+            'service_id': self.config.get('sid'),
+            'point_list': json.dumps(points, separators=(',', ':')),
+        }
+        async with self.http.post(self.api, data=pms, timeout=aiohttp.ClientTimeout(total=SEND_TIMEOUT)) as res:
+            res.raise_for_status()
+            rdt = json.loads(await res.text()) or {}
+        if rdt.get('status') in YINGYAN_TRANSIENT:
+            raise TransientForwardError(rdt)
+        if rdt.get('status'):
+            raise ForwardError(rdt)
+        if rdt.get('fail_info'):
+            _LOGGER.warning('%s: Some points rejected by baidu yingyan: %s', self.vin, rdt.get('fail_info'))
@@ -0,0 +1,121 @@
+"""Reverse geocoding helpers for the device tracker."""
+import logging
+import asyncio
+import collections
+from math import cos, floor, radians, sqrt
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import *
+
+_LOGGER = logging.getLogger(__name__)
+
+GEOCODE_RADIUS = 50
+GEOCODE_CACHE_SIZE = 2000
+SAVE_DELAY = 60
+METERS_PER_DEGREE = 111320
+
+
+class GeocodeCache:
+    """LRU cache of reverse geocoding results on a grid of cells about `radius` metres wide.
+
+    A point resolves to the nearest cached result within `radius` metres, looking at its own cell
+    and the eight around it.
+    """
+
+    def __init__(self, hass: HomeAssistant, radius=GEOCODE_RADIUS, maxsize=GEOCODE_CACHE_SIZE):
+        self.hass = hass
+        self.radius = radius
+        self.maxsize = maxsize
+        self.store = Store(hass, 1, f'{DOMAIN}/geocode.json')
+        self.cells = None
+        self.lock = asyncio.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    async def async_load(self):
+        async with self.lock:
+            if self.cells is None:
+                data = await self.store.async_load() or {}
+                self.cells = collections.OrderedDict()
+                # cells are rebuilt from the points, so a changed radius takes effect on load
+                for lat, lng, result in data.get('points') or []:
+                    self.put(lat, lng, result)
+        return self.cells
+
+    def cell(self, lat, lng):
+        row = floor(lat * METERS_PER_DEGREE / self.radius)
+        # the width of a cell in degrees only depends on its row, so neighbour columns line up
+        lng_size = self.radius / (METERS_PER_DEGREE * max(cos(radians(row * self.radius / METERS_PER_DEGREE)), 0.01))
+        return row, floor(lng / lng_size)
+
+    def distance(self, lat0, lng0, lat1, lng1):
+        dx = (lng1 - lng0) * cos(radians((lat0 + lat1) / 2))
+        dy = lat1 - lat0
+        return sqrt(dx * dx + dy * dy) * METERS_PER_DEGREE
+
+    def nearest(self, lat, lng):
+        row, col = self.cell(lat, lng)
+        found = None
+        for r in (row - 1, row, row + 1):
+            for c in (col - 1, col, col + 1):
+                key = f'{r}:{c}'
+                ent = self.cells.get(key)
+                if not ent:
+                    continue
+                dis = self.distance(lat, lng, ent[0], ent[1])
+                if dis <= self.radius and (not found or dis < found[0]):
+                    found = (dis, key)
+        return found[1] if found else None
+
+    def put(self, lat, lng, result):
+        row, col = self.cell(lat, lng)
+        key = f'{row}:{col}'
+        self.cells[key] = (lat, lng, result)
+        self.cells.move_to_end(key)
+        while len(self.cells) > self.maxsize:
+            self.cells.popitem(last=False)
+
+    async def async_get(self, lat, lng):
+        await self.async_load()
+        if key := self.nearest(lat, lng):
+            self.cells.move_to_end(key)
+            self.stats['hits'] += 1
+            return self.cells[key][2]
+        self.stats['misses'] += 1
+        return None
+
+    async def async_set(self, lat, lng, result):
+        await self.async_load()
+        self.put(lat, lng, result)
+        self.store.async_delay_save(self.data_to_save, SAVE_DELAY)
+
+    def data_to_save(self):
+        return {
+            'radius': self.radius,
+            'points': [list(v) for v in self.cells.values()],
+        }
+
+
+def compact_geocode(geo: dict):
+    """Keep only the parts of a geocoder result which the tracker uses."""
+    pois = geo.get('pois') or []
+    return {
+        'address': geo.get('address', ''),
+        'pois': [
+            {
+                'title': poi.get('title', ''),
+                'address': poi.get('address', ''),
+                'ad_info': poi.get('ad_info') or {},
+            }
+            for poi in pois[:1]
+        ],
+    }
+
+
+def get_geocode_cache(hass: HomeAssistant) -> GeocodeCache:
+    if not (cache := hass.data[DOMAIN].get('geocode_cache')):
+        cfg = hass.data[DOMAIN].get('config') or {}
+        cache = GeocodeCache(hass, cfg.get(CONF_GEOCODE_RADIUS) or GEOCODE_RADIUS)
+        hass.data[DOMAIN]['geocode_cache'] = cache
+    return cache
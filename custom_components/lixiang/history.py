@@ -0,0 +1,208 @@
+"""Append-only local history of api snapshots in SQLite."""
+import logging
+import json
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+
+from .const import *
+
+_LOGGER = logging.getLogger(__name__)
+
+HISTORY_DAYS = 90
+KEYFRAME_EVERY = 100
+FLUSH_RECORDS = 50
+FLUSH_INTERVAL = 30
+PRUNE_INTERVAL = 86400
+KIND_FULL = 0
+KIND_DELTA = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    vin TEXT NOT NULL,
+    section TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    kind INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots (vin, section, ts);
+"""
+
+
+def flatten(data, prefix='', out=None):
+    """Nested dicts to dotted paths, other values are kept as they are."""
+    if out is None:
+        out = {}
+    for k, v in data.items():
+        key = f'{prefix}{k}'
+        if isinstance(v, dict) and v:
+            flatten(v, f'{key}.', out)
+        else:
+            out[key] = v
+    return out
+
+
+def diff(old: dict, new: dict):
+    """Changed or added paths, and the removed ones in `-`."""
+    delta = {k: v for k, v in new.items() if k not in old or old[k] != v}
+    if removed := [k for k in old if k not in new]:
+        delta['-'] = removed
+    return delta
+
+
+def encode(data):
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode())
+
+
+def decode(raw):
+    return json.loads(zlib.decompress(raw))
+
+
+class HistoryStore:
+    """Snapshots of each car and section, a full keyframe every KEYFRAME_EVERY records and deltas between.
+
+    Records are buffered and written in batches by a single worker thread, which owns the connection.
+    """
+
+    def __init__(self, hass: HomeAssistant, path=None, days=HISTORY_DAYS):
+        self.hass = hass
+        self.path = path or hass.config.path('.storage', DOMAIN, 'history.db')
+        self.days = days
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'{DOMAIN}-history')
+        self.conn = None
+        self.last = {}
+        self.buffer = []
+        self.flushed_at = time.monotonic()
+        self.flushing = None
+        self.pruned_at = 0
+        self.stats = {'records': 0, 'skipped': 0, 'bytes': 0}
+
+    async def async_run(self, func, *args):
+        return await self.hass.loop.run_in_executor(self.executor, func, *args)
+
+    def connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path)
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def record(self, vin, section, data: dict, ts=None):
+        if not data:
+            return
+        flat = flatten(data)
+        key = (vin, section)
+        prev, count = self.last.get(key, (None, 0))
+        if prev is not None and count < KEYFRAME_EVERY:
+            if not (delta := diff(prev, flat)):
+                self.stats['skipped'] += 1
+                return
+            kind, payload, count = KIND_DELTA, delta, count + 1
+        else:
+            kind, payload, count = KIND_FULL, flat, 1
+        self.last[key] = (flat, count)
+        raw = encode(payload)
+        self.stats['records'] += 1
+        self.stats['bytes'] += len(raw)
+        self.buffer.append((vin, section, int(ts or time.time() * 1000), kind, raw))
+        if len(self.buffer) >= FLUSH_RECORDS or time.monotonic() - self.flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer or self.flushing:
+            return self.flushing
+        rows, self.buffer = self.buffer, []
+        self.flushed_at = time.monotonic()
+        self.flushing = self.hass.async_create_task(self.async_run(self._write, rows))
+        self.flushing.add_done_callback(self._flushed)
+        return self.flushing
+
+    def _flushed(self, fut):
+        self.flushing = None
+        if not fut.cancelled() and (exc := fut.exception()):
+            _LOGGER.warning('Write history failed: %s', exc)
+
+    def _write(self, rows):
+        conn = self.connect()
+        with conn:
+            conn.executemany('INSERT INTO snapshots (vin, section, ts, kind, data) VALUES (?, ?, ?, ?, ?)', rows)
+        if self.days and time.time() - self.pruned_at > PRUNE_INTERVAL:
+            self.pruned_at = time.time()
+            self._prune(int((time.time() - self.days * 86400) * 1000))
+
+    def _prune(self, before):
+        conn = self.connect()
+        with conn:
+            # rows before the last keyframe older than the cutoff are no longer needed to decode later ones
+            cur = conn.execute(
+                'DELETE FROM snapshots WHERE ts < ('
+                ' SELECT MAX(k.ts) FROM snapshots k'
+                ' WHERE k.vin = snapshots.vin AND k.section = snapshots.section AND k.kind = ? AND k.ts <= ?'
+                ')', (KIND_FULL, before),
+            )
+        if cur.rowcount:
+            _LOGGER.info('Pruned %s history records', cur.rowcount)
+
+    async def async_close(self, *_):
+        while fut := self.flush():
+            await fut
+        if self.conn:
+            await self.async_run(self.conn.close)
+            self.conn = None
+        self.executor.shutdown(wait=False)
+
+    async def async_query(self, vin, section, fields=None, start=None, end=None, limit=None):
+        while fut := self.flush():
+            await fut
+        return await self.async_run(self._query, vin, section, fields, start, end, limit)
+
+    def _query(self, vin, section, fields, start, end, limit):
+        """Rows of [ts, *fields] in time range, or of [ts, snapshot] without fields."""
+        conn = self.connect()
+        sta = 0
+        if start is not None:
+            row = conn.execute(
+                'SELECT MAX(ts) FROM snapshots WHERE vin = ? AND section = ? AND kind = ? AND ts <= ?',
+                (vin, section, KIND_FULL, start),
+            ).fetchone()
+            sta = row[0] if row and row[0] is not None else 0
+        sql = 'SELECT ts, kind, data FROM snapshots WHERE vin = ? AND section = ? AND ts >= ?'
+        args = [vin, section, sta]
+        if end is not None:
+            sql += ' AND ts <= ?'
+            args.append(end)
+        rows = []
+        state = {}
+        for ts, kind, raw in conn.execute(sql + ' ORDER BY ts', args):
+            data = decode(raw)
+            if kind == KIND_FULL:
+                state = data
+            else:
+                for k in data.pop('-', []):
+                    state.pop(k, None)
+                state.update(data)
+            if start is not None and ts < start:
+                continue
+            if fields:
+                rows.append([ts, *[state.get(f) for f in fields]])
+            else:
+                rows.append([ts, dict(state)])
+            if limit and len(rows) >= limit:
+                break
+        return rows
+
+
+def get_history_store(hass: HomeAssistant):
+    """The shared history store when the `history` option is enabled."""
+    cfg = hass.data[DOMAIN].get('config') or {}
+    if not cfg.get(CONF_HISTORY):
+        return None
+    if not (store := hass.data[DOMAIN].get('history_store')):
+        store = HistoryStore(hass, days=cfg.get(CONF_HISTORY_DAYS, HISTORY_DAYS))
+        hass.data[DOMAIN]['history_store'] = store
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, store.async_close)
+    return store
@@ -0,0 +1,149 @@
+"""Content-addressed disk cache of parking photos."""
+import logging
+import asyncio
+import hashlib
+import os
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import *
+
+_LOGGER = logging.getLogger(__name__)
+
+PHOTO_CACHE_BYTES = 200 * 1024 * 1024
+PHOTO_CACHE_AGE = 30 * 86400
+SAVE_DELAY = 30
+EVICT_EVERY = 20
+# query params of signed object storage urls, which change on every request of the same photo
+SIGNATURE_PARAMS = ['expires', 'signature', 'ossaccesskeyid', 'security-token', 'auth_key', 'sign']
+SIGNATURE_PREFIXES = ['x-oss-', 'x-amz-', 'x-cos-']
+
+
+def photo_key(url):
+    parts = urlsplit(url)
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in SIGNATURE_PARAMS and not k.lower().startswith(tuple(SIGNATURE_PREFIXES))
+    ]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+class PhotoCache:
+    """Photo bytes are stored once by their sha256, an index maps photo urls to digests."""
+
+    def __init__(self, hass: HomeAssistant, path=None, max_bytes=PHOTO_CACHE_BYTES, max_age=PHOTO_CACHE_AGE):
+        self.hass = hass
+        self.path = path or hass.config.path('.storage', DOMAIN, 'photos')
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.store = Store(hass, 1, f'{DOMAIN}/photos.json')
+        self.index = None
+        self.inflight = {}
+        self.lock = asyncio.Lock()
+        self.downloads = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0}
+
+    async def async_load(self):
+        async with self.lock:
+            if self.index is None:
+                data = await self.store.async_load() or {}
+                self.index = data.get('index') or {}
+                await self.async_evict()
+        return self.index
+
+    def blob_path(self, digest):
+        return os.path.join(self.path, digest[:2], digest)
+
+    def read_blob(self, digest):
+        file = self.blob_path(digest)
+        try:
+            with open(file, 'rb') as fp:
+                raw = fp.read()
+            os.utime(file)
+        except FileNotFoundError:
+            return None
+        return raw
+
+    def write_blob(self, digest, raw):
+        file = self.blob_path(digest)
+        if os.path.exists(file):
+            os.utime(file)
+            return
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        tmp = f'{file}.tmp'
+        with open(tmp, 'wb') as fp:
+            fp.write(raw)
+        os.replace(tmp, file)
+
+    async def async_get(self, url, download):
+        """Return photo bytes of the url from disk, or from `download(url)` on a miss."""
+        index = await self.async_load()
+        key = photo_key(url)
+        if digest := index.get(key):
+            if raw := await self.hass.async_add_executor_job(self.read_blob, digest):
+                self.stats['hits'] += 1
+                return raw
+            index.pop(key, None)
+        if task := self.inflight.get(key):
+            return await asyncio.shield(task)
+        task = self.hass.async_create_task(self._async_download(key, url, download))
+        self.inflight[key] = task
+        task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _async_download(self, key, url, download):
+        self.stats['misses'] += 1
+        raw = await download(url)
+        if not raw:
+            return raw
+        digest = hashlib.sha256(raw).hexdigest()
+        await self.hass.async_add_executor_job(self.write_blob, digest, raw)
+        self.index[key] = digest
+        self.store.async_delay_save(lambda: {'index': self.index}, SAVE_DELAY)
+        self.downloads += 1
+        if self.downloads % EVICT_EVERY == 0:
+            await self.async_evict()
+        return raw
+
+    def evict(self):
+        """Remove blobs older than max_age, then the least recently used ones until under max_bytes."""
+        if not os.path.isdir(self.path):
+            return set()
+        blobs = []
+        for root, _, files in os.walk(self.path):
+            for f in files:
+                file = os.path.join(root, f)
+                st = os.stat(file)
+                blobs.append((st.st_mtime, st.st_size, f, file))
+        blobs.sort()
+        total = sum(b[1] for b in blobs)
+        expire = time.time() - self.max_age
+        removed = set()
+        for mtime, size, digest, file in blobs:
+            if mtime >= expire and total <= self.max_bytes:
+                break
+            os.remove(file)
+            total -= size
+            removed.add(digest)
+        return removed
+
+    async def async_evict(self):
+        removed = await self.hass.async_add_executor_job(self.evict)
+        if not removed:
+            return
+        self.stats['evicted'] += len(removed)
+        for k, digest in list(self.index.items()):
+            if digest in removed:
+                self.index.pop(k, None)
+        self.store.async_delay_save(lambda: {'index': self.index}, SAVE_DELAY)
+        _LOGGER.debug('Evicted %s cached photos', len(removed))
+
+
+def get_photo_cache(hass: HomeAssistant) -> PhotoCache:
+    if not (cache := hass.data[DOMAIN].get('photo_cache')):
+        cache = hass.data[DOMAIN]['photo_cache'] = PhotoCache(hass)
+    return cache
@@ -32,9 +32,9 @@ class XSensorEntity(BaseEntity, SensorEntity, RestoreEntity):
     _attr_native_unit_of_measurement = None
 
     async def async_added_to_hass(self):
-        await super().async_added_to_hass()
         self._attr_state_class = self._option.get('state_class')
         self._attr_native_unit_of_measurement = self._attr_unit_of_measurement
+        await super().async_added_to_hass()
 
     def set_state(self):
         self._attr_native_value = self._attr_state
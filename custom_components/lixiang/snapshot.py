@@ -0,0 +1,113 @@
+"""Persisted snapshots of the api data of cars."""
+import logging
+import asyncio
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import *
+
+_LOGGER = logging.getLogger(__name__)
+
+SAVE_DELAY = 10
+SNAPSHOT_SECTIONS = [
+    'car_info',
+    'car_status',
+    'car_mileage',
+    'tire_status',
+    'energy_cost',
+    'park_photos',
+]
+
+
+class SnapshotStore:
+    """Snapshot of one car in `car-{vin}.json`.
+
+    Saves are delayed, and further saves within the delay join the pending one instead of
+    postponing it, so a burst of updates is written once and a steady stream at most every delay.
+    """
+
+    def __init__(self, hass: HomeAssistant, vin, delay=SAVE_DELAY):
+        self.hass = hass
+        self.vin = vin
+        self.delay = delay
+        self.store = Store(hass, 1, f'{DOMAIN}/car-{vin}.json')
+        self.data_func = None
+        self.pending = False
+        self.writes = 0
+
+    async def async_load(self):
+        return await self.store.async_load() or {}
+
+    def async_delay_save(self, data_func):
+        self.data_func = data_func
+        if self.pending:
+            return
+        self.pending = True
+        self.store.async_delay_save(self._data_to_save, self.delay)
+
+    def _data_to_save(self):
+        self.pending = False
+        self.writes += 1
+        return self.data_func()
+
+
+class FleetStore(SnapshotStore):
+    """Snapshots of all cars in one `fleet.json`, read once at startup and written once per burst."""
+
+    def __init__(self, hass: HomeAssistant, delay=SAVE_DELAY):
+        super().__init__(hass, None, delay)
+        self.store = Store(hass, 1, f'{DOMAIN}/fleet.json')
+        self.cars = None
+        self.sources = {}
+        self.lock = asyncio.Lock()
+
+    async def async_load_car(self, vin):
+        async with self.lock:
+            if self.cars is None:
+                data = await self.store.async_load() or {}
+                self.cars = data.get(CONF_CARS) or {}
+        if vin not in self.cars:
+            # migrate the snapshot of a car from its own file
+            legacy = SnapshotStore(self.hass, vin)
+            if data := await legacy.async_load():
+                self.cars[vin] = data
+                _LOGGER.info('%s: Migrated snapshot into the fleet store', vin)
+        return self.cars.get(vin) or {}
+
+    def async_delay_save_car(self, vin, data_func):
+        self.sources[vin] = data_func
+        if self.cars is None:
+            # the other cars of the file must be read before it is written
+            task = self.hass.async_create_task(self.async_load_car(vin))
+            task.add_done_callback(lambda _: self.async_delay_save(self.fleet_data))
+            return
+        self.async_delay_save(self.fleet_data)
+
+    def fleet_data(self):
+        for vin, fun in self.sources.items():
+            self.cars[vin] = fun()
+        return {CONF_CARS: self.cars}
+
+
+class FleetCarStore:
+    """View of one car in the fleet store, with the interface of SnapshotStore."""
+
+    def __init__(self, fleet: FleetStore, vin):
+        self.fleet = fleet
+        self.vin = vin
+
+    async def async_load(self):
+        return await self.fleet.async_load_car(self.vin)
+
+    def async_delay_save(self, data_func):
+        self.fleet.async_delay_save_car(self.vin, data_func)
+
+
+def get_snapshot_store(hass: HomeAssistant, vin):
+    cfg = hass.data[DOMAIN].get('config') or {}
+    if not cfg.get(CONF_FLEET_STORE):
+        return SnapshotStore(hass, vin)
+    if not (fleet := hass.data[DOMAIN].get('fleet_store')):
+        fleet = hass.data[DOMAIN]['fleet_store'] = FleetStore(hass)
+    return FleetCarStore(fleet, vin)
@@ -0,0 +1,203 @@
+"""Compact track of car positions, with GPX and GeoJSON export."""
+import bisect
+from array import array
+from datetime import datetime, timezone
+from math import cos, radians, sqrt
+from xml.sax.saxutils import escape
+
+from .coord_transform import wgs84_to_gcj02_batch, wgs84_to_bd09_batch
+
+TRACK_POINTS = 20000
+RAW_POINTS = 2000
+SIMPLIFY_TOLERANCE = 10
+TRACK_GAP = 600
+METERS_PER_DEGREE = 111320
+COORD_TYPES = {
+    'wgs84': None,
+    'gcj02': wgs84_to_gcj02_batch,
+    'bd09': wgs84_to_bd09_batch,
+}
+COLUMNS = {
+    'lat': 'd',
+    'lon': 'd',
+    'alt': 'f',
+    'dir': 'H',
+    'ct': 'q',
+    'speed': 'f',
+}
+
+
+class TrackBuffer:
+    """Positions in typed column arrays, ordered by time.
+
+    The newest `raw_points` are kept as reported, older ones are simplified with Douglas-Peucker
+    in chunks, and the oldest are dropped beyond `max_points`.
+    """
+
+    __slots__ = ('lat', 'lon', 'alt', 'dir', 'ct', 'speed', 'max_points', 'raw_points', 'tolerance', 'simplified')
+
+    def __init__(self, max_points=TRACK_POINTS, raw_points=RAW_POINTS, tolerance=SIMPLIFY_TOLERANCE):
+        for k, typ in COLUMNS.items():
+            setattr(self, k, array(typ))
+        self.max_points = max_points
+        self.raw_points = raw_points
+        self.tolerance = tolerance
+        # points before this index have already been simplified
+        self.simplified = 0
+
+    def __len__(self):
+        return len(self.ct)
+
+    def columns(self):
+        return [getattr(self, k) for k in COLUMNS]
+
+    def append(self, lat, lon, alt=0, dir=0, ct=0, speed=0):  # noqa: A002
+        if self.ct and ct <= self.ct[-1]:
+            return False
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.alt.append(alt or 0)
+        self.dir.append(int(dir or 0) % 360)
+        self.ct.append(int(ct))
+        self.speed.append(speed or 0)
+        if len(self) - self.simplified >= self.raw_points * 2:
+            self.compact()
+        return True
+
+    def compact(self):
+        sta = self.simplified
+        end = len(self) - self.raw_points
+        if end - sta > 2:
+            keep = simplify(self.lat[sta:end], self.lon[sta:end], self.ct[sta:end], self.tolerance)
+            for col in self.columns():
+                col[sta:end] = array(col.typecode, [col[sta + i] for i in keep])
+            end = sta + len(keep)
+        self.simplified = end
+        if (drop := len(self) - self.max_points) > 0:
+            for col in self.columns():
+                del col[:drop]
+            self.simplified = max(0, self.simplified - drop)
+
+    def span(self, start=None, end=None):
+        """Index range of the points with ct in [start, end] milliseconds."""
+        sta = bisect.bisect_left(self.ct, start) if start is not None else 0
+        end = bisect.bisect_right(self.ct, end) if end is not None else len(self)
+        return range(sta, max(sta, end))
+
+    def segments(self, start=None, end=None):
+        """Split the range of points where the car was not reported for more than TRACK_GAP seconds."""
+        span = self.span(start, end)
+        sta = span.start
+        for i in span[1:]:
+            if self.ct[i] - self.ct[i - 1] > TRACK_GAP * 1000:
+                yield range(sta, i)
+                sta = i
+        if span:
+            yield range(sta, span.stop)
+
+    def positions(self, seg: range, coord='wgs84'):
+        lon = self.lon[seg.start:seg.stop]
+        lat = self.lat[seg.start:seg.stop]
+        if fun := COORD_TYPES.get(coord):
+            lon, lat = fun(lon, lat)
+        return zip(*[v.tolist() if hasattr(v, 'tolist') else v for v in (lon, lat)])
+
+    def to_geojson(self, start=None, end=None, name=None, coord='wgs84'):
+        features = []
+        for seg in self.segments(start, end):
+            features.append({
+                'type': 'Feature',
+                'geometry': {
+                    'type': 'LineString',
+                    'coordinates': [
+                        [lon, lat, round(self.alt[i], 1)]
+                        for i, (lon, lat) in zip(seg, self.positions(seg, coord))
+                    ],
+                },
+                'properties': {
+                    'name': name,
+                    'coordType': coord,
+                    'coordTimes': [iso_time(self.ct[i]) for i in seg],
+                    'directions': [self.dir[i] for i in seg],
+                    'speeds': [round(self.speed[i], 2) for i in seg],
+                },
+            })
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def to_gpx(self, start=None, end=None, name=None, coord='wgs84'):
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<gpx version="1.1" creator="lixiang" xmlns="http://www.topografix.com/GPX/1/1">',
+            '<trk>',
+        ]
+        if name:
+            lines.append(f'<name>{escape(name)}</name>')
+        for seg in self.segments(start, end):
+            lines.append('<trkseg>')
+            lines.extend(
+                f'<trkpt lat="{lat}" lon="{lon}">'
+                f'<ele>{round(self.alt[i], 1)}</ele><time>{iso_time(self.ct[i])}</time></trkpt>'
+                for i, (lon, lat) in zip(seg, self.positions(seg, coord))
+            )
+            lines.append('</trkseg>')
+        lines.extend(['</trk>', '</gpx>', ''])
+        return '\n'.join(lines)
+
+    def as_dict(self):
+        return {
+            **{k: col.tolist() for k, col in zip(COLUMNS, self.columns())},
+            'simplified': self.simplified,
+        }
+
+    def load(self, data: dict):
+        if not data or not data.get('ct'):
+            return
+        for k, typ in COLUMNS.items():
+            setattr(self, k, array(typ, data.get(k) or [0] * len(data['ct'])))
+        self.simplified = min(data.get('simplified', 0), len(self))
+        if len(self) > self.max_points:
+            self.compact()
+
+
+def iso_time(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def simplify(lat, lon, ct, tolerance):
+    """Indexes of the points kept by Douglas-Peucker, both ends of a reporting gap are always kept."""
+    num = len(lat)
+    if num < 3:
+        return list(range(num))
+    kx = cos(radians(lat[0])) * METERS_PER_DEGREE
+    keep = bytearray(num)
+    keep[0] = keep[-1] = 1
+    for i in range(1, num):
+        if ct[i] - ct[i - 1] > TRACK_GAP * 1000:
+            keep[i - 1] = keep[i] = 1
+    stack = []
+    sta = 0
+    for i in range(1, num):
+        if keep[i]:
+            stack.append((sta, i))
+            sta = i
+    while stack:
+        sta, end = stack.pop()
+        if end - sta < 2:
+            continue
+        x0, y0 = lon[sta] * kx, lat[sta] * METERS_PER_DEGREE
+        dx, dy = lon[end] * kx - x0, lat[end] * METERS_PER_DEGREE - y0
+        nom = sqrt(dx * dx + dy * dy)
+        far, idx = 0.0, 0
+        for i in range(sta + 1, end):
+            px, py = lon[i] * kx - x0, lat[i] * METERS_PER_DEGREE - y0
+            dis = abs(dx * py - dy * px) / nom if nom else sqrt(px * px + py * py)
+            if dis > far:
+                far, idx = dis, i
+        # keep a point at least every TRACK_GAP, so that a longer interval always means a gap in reporting
+        if far <= tolerance and ct[end] - ct[sta] > TRACK_GAP * 1000:
+            far, idx = tolerance + 1, idx or (sta + end) // 2
+        if far > tolerance:
+            keep[idx] = 1
+            stack.append((sta, idx))
+            stack.append((idx, end))
+    return [i for i in range(num) if keep[i]]
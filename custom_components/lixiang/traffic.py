@@ -0,0 +1,143 @@
+"""Record and replay raw LiXiang API traffic."""
+import logging
+import asyncio
+import gzip
+import json
+import os
+import time
+from urllib.parse import urlparse
+
+from homeassistant.core import HomeAssistant
+
+from .const import *
+
+_LOGGER = logging.getLogger(__name__)
+
+FLUSH_RECORDS = 20
+FLUSH_INTERVAL = 60
+ROTATE_BYTES = 4 * 1024 * 1024
+KEEP_FILES = 240
+
+
+def traffic_dir(hass: HomeAssistant, vin, path=None):
+    return os.path.join(path or hass.config.path('.storage', DOMAIN, 'traffic'), vin)
+
+
+class TrafficRecorder:
+    """Append raw responses of a car to gzipped json lines files, rotated by size."""
+
+    def __init__(self, hass: HomeAssistant, vin, path=None, rotate_bytes=ROTATE_BYTES, keep_files=KEEP_FILES):
+        self.hass = hass
+        self.vin = vin
+        self.path = traffic_dir(hass, vin, path)
+        self.rotate_bytes = rotate_bytes
+        self.keep_files = keep_files
+        self.buffer = []
+        self.file = None
+        self.written = 0
+        self.flushed_at = time.monotonic()
+        self.flushing = None
+
+    def record(self, method, url, params, response):
+        self.buffer.append(json.dumps({
+            'ts': int(time.time() * 1000),
+            'method': method,
+            'api': urlparse(url).path or url,
+            'params': params or None,
+            'response': response,
+        }, ensure_ascii=False, separators=(',', ':')))
+        if len(self.buffer) >= FLUSH_RECORDS or time.monotonic() - self.flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer or self.flushing:
+            return self.flushing
+        lines, self.buffer = self.buffer, []
+        self.flushed_at = time.monotonic()
+        self.flushing = self.hass.async_add_executor_job(self._write, lines)
+        self.flushing.add_done_callback(self._flushed)
+        return self.flushing
+
+    def _flushed(self, fut):
+        self.flushing = None
+        if not fut.cancelled() and (exc := fut.exception()):
+            _LOGGER.warning('%s: Record traffic failed: %s', self.vin, exc)
+
+    def _write(self, lines):
+        os.makedirs(self.path, exist_ok=True)
+        if not self.file or self.written >= self.rotate_bytes:
+            self.file = os.path.join(self.path, time.strftime('traffic-%Y%m%d-%H%M%S.jsonl.gz'))
+            self.written = 0
+            self._cleanup()
+        raw = ('\n'.join(lines) + '\n').encode()
+        # every flush appends one gzip member, readers decompress them as one stream
+        with gzip.open(self.file, 'ab') as fp:
+            fp.write(raw)
+        self.written += len(raw)
+
+    def _cleanup(self):
+        files = sorted(f for f in os.listdir(self.path) if f.startswith('traffic-'))
+        for f in files[:max(0, len(files) - self.keep_files + 1)]:
+            os.remove(os.path.join(self.path, f))
+
+    async def async_close(self):
+        while fut := self.flush():
+            await fut
+
+
+class TrafficReplayer:
+    """Feed a recorded timeline back into a car at real or accelerated speed, 0 means no delay."""
+
+    def __init__(self, device, path=None, speed=1.0):
+        self.device = device
+        self.hass = device.hass
+        self.path = traffic_dir(device.hass, device.vin, path)
+        self.speed = speed
+        self.task = None
+        self.stats = {'records': 0, 'applied': 0, 'files': 0}
+
+    def files(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            os.path.join(self.path, f)
+            for f in os.listdir(self.path)
+            if f.startswith('traffic-')
+        )
+
+    @staticmethod
+    def read(file):
+        with gzip.open(file, 'rt') as fp:
+            return [json.loads(line) for line in fp if line.strip()]
+
+    async def async_replay(self):
+        prev = None
+        started = time.monotonic()
+        files = await self.hass.async_add_executor_job(self.files)
+        for file in files:
+            records = await self.hass.async_add_executor_job(self.read, file)
+            self.stats['files'] += 1
+            for rec in records:
+                self.stats['records'] += 1
+                if prev and self.speed:
+                    await asyncio.sleep(max(0, rec['ts'] - prev) / 1000 / self.speed)
+                prev = rec['ts']
+                rsp = rec.get('response') or {}
+                data = rsp.get('data') if isinstance(rsp, dict) else None
+                if data and await self.device.async_set_data(rec.get('api', ''), data):
+                    self.stats['applied'] += 1
+                    await self.device.update_entities()
+        _LOGGER.info('%s: Replayed traffic in %.1fs: %s', self.device.name, time.monotonic() - started, self.stats)
+        return self.stats
+
+    def start(self):
+        if not self.task:
+            self.task = self.hass.async_create_background_task(
+                self.async_replay(), f'{DOMAIN}-{self.device.vin}-replay',
+            )
+        return self.task
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
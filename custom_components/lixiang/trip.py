@@ -0,0 +1,191 @@
+"""Split the real-time state of a car into trips."""
+import logging
+import collections
+import time
+from math import asin, cos, radians, sin, sqrt
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import *
+
+_LOGGER = logging.getLogger(__name__)
+
+TRIP_END_GRACE = 180
+TRIP_MIN_DISTANCE = 0.1
+MAX_TRIPS = 500
+SAVE_DELAY = 60
+EARTH_RADIUS = 6371
+
+
+class TripDetector:
+    """Streaming trip segmentation, each sample is handled in O(1).
+
+    A trip starts with the first sample out of P gear and ends once the car has stayed in P for
+    TRIP_END_GRACE seconds, so short stops at traffic lights or gates do not split it. A parked car
+    which goes to sleep keeps reporting the same snapshot, so the grace is also counted on the time of
+    the polls, and the trip ends at once when the car goes offline in P.
+    """
+
+    def __init__(self, hass: HomeAssistant, vin, max_trips=MAX_TRIPS):
+        self.hass = hass
+        self.vin = vin
+        self.store = Store(hass, 1, f'{DOMAIN}/trips-{vin}.json')
+        self.trips = collections.deque(maxlen=max_trips)
+        self.current = None
+        self.parked = None
+        self.last_ts = 0
+        self.loaded = False
+
+    async def async_load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        data = await self.store.async_load() or {}
+        self.trips.extend(data.get('trips') or [])
+        self.current = data.get('current')
+        self.parked = data.get('parked')
+        self.last_ts = data.get('last_ts') or 0
+
+    def save(self):
+        self.store.async_delay_save(self.data_to_save, SAVE_DELAY)
+
+    def data_to_save(self):
+        return {
+            'trips': list(self.trips),
+            'current': self.current,
+            'parked': self.parked,
+            'last_ts': self.last_ts,
+        }
+
+    @property
+    def last(self):
+        return self.trips[-1] if self.trips else {}
+
+    def sample(self, ts, gear, lat=None, lon=None, mileage=None, battery=None, fuel=None, poi=None,
+               online=True, now=None):
+        """Feed one snapshot, return the trip it finished if any."""
+        now = time.time() if now is None else now
+        cur = self.current
+        if not ts or ts <= self.last_ts:
+            # an unchanged snapshot, the car may have parked and gone to sleep
+            if cur and cur['parked_at'] and self.parked_enough(cur, cur['parked_at'], now, online):
+                return self.finish(cur, {**cur['last'], 'poi': poi or cur['last']['poi']})
+            return None
+        self.last_ts = ts
+        point = {
+            'ts': ts,
+            'lat': lat,
+            'lon': lon,
+            'mileage': mileage,
+            'battery': battery,
+            'fuel': fuel,
+            'poi': poi,
+        }
+        moving = gear not in [None, '', 'P']
+        if cur is None:
+            if moving:
+                self.start(point)
+            else:
+                self.parked = point
+            return None
+        if not moving:
+            self.advance(cur, point)
+            if not cur['parked_at']:
+                cur['parked_at'] = ts
+                cur['parked_since'] = now
+                cur['end'] = point
+            if self.parked_enough(cur, ts, now, online):
+                return self.finish(cur, point)
+            return None
+        if cur['parked_at'] and self.parked_enough(cur, ts, now):
+            # parked for long between two samples, the trip ended where the car parked
+            trip = self.finish(cur, cur['last'])
+            self.start(point)
+            return trip
+        self.advance(cur, point)
+        cur['parked_at'] = None
+        cur['parked_since'] = None
+        return None
+
+    def start(self, point):
+        # levels and place of the start are the ones reported while still parked
+        self.current = {
+            'start': point['ts'],
+            'first': self.parked or point,
+            'last': point,
+            'distance': 0.0,
+            'parked_at': None,
+            'parked_since': None,
+        }
+        self.parked = None
+        self.save()
+
+    @staticmethod
+    def parked_enough(cur, ts, now, online=True):
+        if not online:
+            return True
+        if ts - cur['parked_at'] >= TRIP_END_GRACE:
+            return True
+        return bool(cur.get('parked_since')) and now - cur['parked_since'] >= TRIP_END_GRACE
+
+    def finish(self, cur, point):
+        self.current = None
+        self.parked = point
+        self.save()
+        trip = self.summary(cur, point)
+        if trip['distance'] < TRIP_MIN_DISTANCE:
+            return None
+        self.trips.append(trip)
+        return trip
+
+    @staticmethod
+    def advance(cur, point):
+        last = cur['last']
+        if None not in [last['lat'], last['lon'], point['lat'], point['lon']]:
+            cur['distance'] += distance(last['lat'], last['lon'], point['lat'], point['lon'])
+        cur['last'] = point
+
+    @staticmethod
+    def summary(cur, point):
+        first = cur['first']
+        end = cur.get('end') or point
+        dis = cur['distance']
+        if first['mileage'] is not None and end['mileage'] is not None and end['mileage'] >= first['mileage']:
+            # the odometer is more accurate than the polled positions, when it was refreshed
+            dis = max(dis, end['mileage'] - first['mileage'])
+        used = lambda k: max(0, first[k] - end[k]) if first[k] is not None and end[k] is not None else None
+        return {
+            'start': cur['start'],
+            'end': end['ts'],
+            'duration': round(end['ts'] - cur['start']),
+            'distance': round(dis, 2),
+            'battery_used': used('battery'),
+            'fuel_used': used('fuel'),
+            'start_location': [first['lat'], first['lon']],
+            'end_location': [end['lat'], end['lon']],
+            'start_poi': first['poi'],
+            # the end place has been geocoded by now, while the car stayed parked
+            'end_poi': point['poi'],
+        }
+
+    def query(self, start=None, end=None, limit=None):
+        """Trips overlapping [start, end] in seconds, newest first."""
+        lst = []
+        for trip in reversed(self.trips):
+            if start is not None and trip['end'] < start:
+                break
+            if end is not None and trip['start'] > end:
+                continue
+            lst.append(trip)
+            if limit and len(lst) >= limit:
+                break
+        return lst
+
+
+def distance(lat0, lng0, lat1, lng1):
+    """Haversine distance in km."""
+    dlat = radians(lat1 - lat0)
+    dlng = radians(lng1 - lng0)
+    h = sin(dlat / 2) ** 2 + cos(radians(lat0)) * cos(radians(lat1)) * sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS * asin(sqrt(h))
@@ -0,0 +1,118 @@
+"""Ingest api responses captured on the phone, pushed in batches."""
+import logging
+import re
+from functools import lru_cache
+from http import HTTPStatus
+
+from homeassistant.core import HomeAssistant
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.const import CONF_URL
+
+from .const import *
+
+_LOGGER = logging.getLogger(__name__)
+
+URL_ROUTES = [
+    ('car_info', re.compile(r'/aisp-account-api/v1-0/vehicles/(?P<vin>\w+)$')),
+    ('car_status', re.compile(r'/real-time-state')),
+    ('car_mileage', re.compile(r'/vehicles/energy-cost/total/')),
+    ('tire_status', re.compile(r'/vehicles/tire/alarm/')),
+    ('energy_cost', re.compile(r'/vehicles/energy-cost/monthly/(?P<year>\d+)/(?P<month>\d+)/')),
+    ('park_photos', re.compile(r'/parking-photos')),
+]
+
+
+@lru_cache(maxsize=256)
+def route_url(url):
+    """Section of the car data and the url arguments of an api url, or None."""
+    for section, pattern in URL_ROUTES:
+        if match := pattern.search(url):
+            return section, match.groupdict()
+    return None, {}
+
+
+def payload_time(section, data):
+    """Newest timestamp in ms carried by a response, or None for sections without one."""
+    if not isinstance(data, dict):
+        return None
+    if section == 'car_status':
+        tims = [
+            (data.get(k) or {}).get('timestamp')
+            for k in ['vehOnlineStatus', 'travelStatus', 'chargeSetting']
+        ]
+        tims.append((data.get('locationStatus') or {}).get('ct'))
+        tims = [int(t) for t in tims if t]
+        return max(tims) if tims else None
+    if section == 'park_photos':
+        return data.get('picTimestamp') or None
+    return None
+
+
+async def async_ingest(hass: HomeAssistant, items):
+    """Apply a batch of pushed responses of any cars.
+
+    Items are `{vin, url, data, ts}` in the order of capture, `ts` in ms is optional for sections
+    whose responses carry a timestamp. A response not newer than the last applied one of the same
+    section is dropped. Entities and the snapshot of each car are updated once for the whole batch,
+    and the polling of a car is suspended while its pushes keep arriving.
+    """
+    cars = hass.data[DOMAIN][CONF_CARS]
+    counts = {}
+    errors = []
+    for idx, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        vin = item.get(CONF_VIN)
+        if not (car := cars.get(vin) if vin else None):
+            errors.append({'index': idx, 'vin': vin, 'error': 'Car not found.'})
+            continue
+        cnt = counts.setdefault(vin, {'applied': 0, 'stale': 0, 'ignored': 0})
+        url = item.get(CONF_URL) or ''
+        if not (data := item.get('data')) or not isinstance(data, dict):
+            cnt['ignored'] += 1
+            errors.append({'index': idx, 'vin': vin, 'error': 'Empty data.'})
+            continue
+        section, _ = route_url(url)
+        tim = item.get('ts') or payload_time(section, data)
+        if section and tim and tim <= car.section_time(section):
+            cnt['stale'] += 1
+            continue
+        if not await car.async_set_data(url, data):
+            cnt['ignored'] += 1
+            errors.append({'index': idx, 'vin': vin, 'error': f'Unknown url: {url}'})
+            continue
+        if tim:
+            car.push_times[section] = tim
+        cnt['applied'] += 1
+
+    for vin, cnt in counts.items():
+        car = cars[vin]
+        if cnt['applied'] or cnt['stale']:
+            # stale responses still show that the capture on the phone is alive
+            car.on_push()
+        if not cnt['applied']:
+            continue
+        await car.async_sync_store()
+        await car.update_entities()
+    if errors:
+        _LOGGER.debug('Hook data errors: %s', errors)
+    return {CONF_CARS: counts, 'errors': errors}
+
+
+class HookDataView(HomeAssistantView):
+    """POST a list of captured responses, authenticated with a long-lived access token."""
+
+    url = f'/api/{DOMAIN}/hook'
+    name = f'api:{DOMAIN}:hook'
+    requires_auth = True
+
+    async def post(self, request):
+        hass = request.app['hass']
+        try:
+            body = await request.json()
+        except ValueError:
+            return self.json_message('Invalid JSON.', HTTPStatus.BAD_REQUEST)
+        if isinstance(body, dict):
+            body = body.get('items', [body])
+        if not isinstance(body, list):
+            return self.json_message('Expected a list of items.', HTTPStatus.BAD_REQUEST)
+        return self.json(await async_ingest(hass, body))
@@ -0,0 +1,25 @@
+"""Home Assistant with simulated cars on the local stand-in api, for the tests."""
+import argparse
+import shutil
+
+from benchmarks.bench_poll import setup_hass, setup_cars
+from benchmarks.stand_in_server import StandInServer
+
+
+class Harness:
+    def __init__(self, cars=1, domains=None, **server_kwargs):
+        self.args = argparse.Namespace(max_requests=16, rate_limit=0, cars=cars, domains=domains or ['sensor'])
+        self.server = StandInServer(**server_kwargs)
+        self.hass = None
+        self.cars = []
+
+    async def __aenter__(self):
+        url = await self.server.start()
+        self.hass = await setup_hass(self.args)
+        self.cars = await setup_cars(self.hass, url, self.args)
+        return self
+
+    async def __aexit__(self, *_):
+        await self.hass.async_stop(force=True)
+        await self.server.stop()
+        shutil.rmtree(self.hass.config.config_dir, ignore_errors=True)
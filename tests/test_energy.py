@@ -0,0 +1,18 @@
+import asyncio
+
+from tests.common import Harness
+
+
+def test_energy_cost_poll_is_current():
+    async def run():
+        async with Harness() as h:
+            car = h.cars[0]
+            states = []
+            for val in [1.0, 2.0]:
+                h.server.car(car.vin).elec_energy = val
+                await car.update_energy_cost()
+                await h.hass.async_block_till_done()
+                states.append(h.hass.states.get(f'sensor.{car.vin_sort}_monthly_elec'.lower()).state)
+            return states
+
+    assert asyncio.run(run()) == ['1.0', '2.0']
@@ -0,0 +1,41 @@
+import asyncio
+
+from tests.common import Harness
+
+
+def test_first_refresh_skip_rate():
+    async def run():
+        async with Harness(domains=['sensor', 'binary_sensor']) as h:
+            car = h.cars[0]
+            car.write_stats.update(written=0, skipped=0)
+            await car.coordinators['status']['coordinator'].async_refresh()
+            await h.hass.async_block_till_done()
+            return dict(car.write_stats), len(car.entities), car.write_skip_rate
+
+    stats, entities, rate = asyncio.run(run())
+    assert stats == {'written': entities, 'skipped': 0}
+    assert rate == 0
+
+
+def test_refresh_fingerprints_each_entity_once(monkeypatch):
+    from custom_components.lixiang import BaseEntity
+
+    calls = []
+    fingerprint = BaseEntity.state_fingerprint
+
+    def counted(self):
+        calls.append(self.entity_id)
+        return fingerprint(self)
+
+    monkeypatch.setattr(BaseEntity, 'state_fingerprint', counted)
+
+    async def run():
+        async with Harness(domains=['sensor', 'binary_sensor']) as h:
+            car = h.cars[0]
+            calls.clear()
+            await car.coordinators['status']['coordinator'].async_refresh()
+            await h.hass.async_block_till_done()
+            return len(car.entities)
+
+    entities = asyncio.run(run())
+    assert len(calls) == entities
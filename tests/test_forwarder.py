@@ -0,0 +1,65 @@
+import asyncio
+
+from custom_components.lixiang import forwarder
+from custom_components.lixiang.forwarder import TraccarForwarder, YingyanForwarder
+from tests.common import Harness
+
+
+async def wait_for(check, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if check():
+            return
+        await asyncio.sleep(0.01)
+
+
+async def wait_idle(fwd):
+    await wait_for(lambda: not fwd.pending)
+
+
+def test_yingyan_errors_are_classified(monkeypatch):
+    monkeypatch.setattr(forwarder, 'RETRY_BACKOFF', 0.01)
+    monkeypatch.setattr(forwarder, 'MAX_RETRIES', 3)
+
+    async def run():
+        async with Harness(domains=['sensor']) as h:
+            fwd = YingyanForwarder(h.hass, 'VIN', key='ak', sid=1)
+            fwd.api = f'{h.server.base_url}/yingyan/api/v3/track/addpoints'
+            await fwd.async_start()
+            stats = []
+            for status in [302, 2]:
+                h.server.receiver_status = status
+                failed = fwd.stats['retries'] + fwd.stats['rejected']
+                fwd.push({'loc_time': 1})
+                await wait_for(lambda: fwd.stats['retries'] + fwd.stats['rejected'] > failed)
+                h.server.receiver_status = 0
+                await wait_idle(fwd)
+                stats.append(dict(fwd.stats))
+            h.server.receiver_down = True
+            fwd.push({'loc_time': 2})
+            await wait_idle(fwd)
+            stats.append(dict(fwd.stats))
+            fwd.stop()
+            return stats
+
+    transient, permanent, down = asyncio.run(run())
+    assert transient['sent'] == 1 and transient['rejected'] == 0 and transient['retries'] > 0
+    assert permanent['sent'] == 1 and permanent['rejected'] == 1
+    assert down['abandoned'] == 1
+
+
+def test_traccar_client_error_is_dropped(monkeypatch):
+    monkeypatch.setattr(forwarder, 'RETRY_BACKOFF', 0.01)
+
+    async def run():
+        async with Harness(domains=['sensor']) as h:
+            fwd = TraccarForwarder(h.hass, 'VIN', host=f'{h.server.base_url}/traccar')
+            await fwd.async_start()
+            fwd.push({'lat': 1})
+            fwd.push({'id': 'car', 'lat': 1})
+            await wait_idle(fwd)
+            fwd.stop()
+            return dict(fwd.stats), h.server.received['traccar']
+
+    stats, received = asyncio.run(run())
+    assert stats['rejected'] == 1 and stats['sent'] == 1
+    assert received == [{'id': 'car', 'lat': '1'}]
@@ -0,0 +1,21 @@
+import asyncio
+import time
+import types
+
+import custom_components.lixiang as lixiang
+from tests.common import Harness
+
+
+def test_first_poll_soon_after_boot(monkeypatch):
+    async def run():
+        async with Harness() as h:
+            car = h.cars[0]
+            car.car_status = {'vehOnlineStatus': {'status': 'offline'}, 'travelStatus': {'gear': 'P'}}
+            assert car.vehicle_state == 'parked'
+            # monotonic time counts from the boot of the host
+            monkeypatch.setattr(lixiang, 'time', types.SimpleNamespace(monotonic=lambda: 300.0, time=time.time))
+            sent = h.server.request_count
+            await car.update_all_status()
+            return h.server.request_count - sent
+
+    assert asyncio.run(run()) == 4
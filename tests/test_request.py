@@ -0,0 +1,38 @@
+import asyncio
+
+import custom_components.lixiang as lixiang
+from benchmarks.stand_in_server import ERROR_REPLIES
+from tests.common import Harness
+
+
+def test_error_status_is_retried_and_counted(monkeypatch):
+    monkeypatch.setattr(lixiang, 'RETRY_BACKOFF', 0.01)
+
+    async def run(reply):
+        async with Harness(error_rate=1.0, error_replies=[reply]) as h:
+            car = h.cars[0]
+            breaker = car.api_host.breaker
+            breaker.record_success()
+            sent = h.server.request_count
+            dat = await car.async_request(f'/ssp-as-mobile-api/v3-0/vehicles/{car.vin}/real-time-state')
+            return dat, h.server.request_count - sent, breaker.failures
+
+    for reply in ERROR_REPLIES:
+        dat, sent, failures = asyncio.run(run(reply))
+        assert dat == {}
+        assert sent == 3
+        assert failures == 3
+
+
+def test_cache_is_keyed_by_all_credentials():
+    async def run():
+        async with Harness() as h:
+            car = h.cars[0]
+            sent = h.server.request_count
+            await car.update_vehicle_info()
+            cached = h.server.request_count - sent
+            car.config[lixiang.CONF_API_SIGN] = 'other-sign'
+            await car.update_vehicle_info()
+            return cached, h.server.request_count - sent
+
+    assert asyncio.run(run()) == (0, 1)
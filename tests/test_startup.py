@@ -0,0 +1,23 @@
+import asyncio
+
+from tests.common import Harness
+
+
+def test_warm_start_refreshes_vehicle_info():
+    async def run():
+        async with Harness(domains=['sensor']) as h:
+            car = h.cars[0]
+            car.car_status = {'travelStatus': {'gear': 'P'}}
+            car.car_info = {'vin': car.vin, 'plateNumber': 'OLD'}
+            # a restart starts with an empty response cache
+            car.api_host.cache.invalidate()
+            sent = dict(h.server.requests)
+            await car.update_coordinator_first()
+            await h.hass.async_block_till_done()
+            info = [k for k, v in h.server.requests.items() if '/aisp-account-api/' in k and v > sent.get(k, 0)]
+            return car.startup_timing.get('warm'), info, car.car_info.get('plateNumber')
+
+    warm, info, plate = asyncio.run(run())
+    assert warm
+    assert info
+    assert plate != 'OLD'
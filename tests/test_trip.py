@@ -0,0 +1,105 @@
+import asyncio
+
+from custom_components.lixiang.trip import TRIP_END_GRACE, TripDetector
+from tests.common import Harness
+
+T0 = 1700000000
+
+
+def detect(samples):
+    """Feed (ts, gear, lat, now, online) samples, return the finished trips and the detector."""
+    async def run():
+        async with Harness(cars=0) as h:
+            det = TripDetector(h.hass, 'VIN')
+            det.loaded = True
+            trips = []
+            for ts, gear, lat, now, online in samples:
+                if trip := det.sample(ts, gear, lat=lat, lon=116.4, now=now, online=online):
+                    trips.append(trip)
+            return trips, det
+
+    return asyncio.run(run())
+
+
+def drive(start, now=None, lat=39.90, steps=5):
+    now = start if now is None else now
+    return [
+        (start + i * 60, 'P' if i == 0 else 'D', lat + i * 0.01, now + i * 60, True)
+        for i in range(steps)
+    ]
+
+
+def test_trip_ends_after_grace():
+    samples = drive(T0)
+    end = samples[-1][0]
+    samples += [
+        (end + 60, 'P', 39.94, end + 60, True),
+        (end + 60 + TRIP_END_GRACE, 'P', 39.94, end + 60 + TRIP_END_GRACE, True),
+    ]
+    trips, det = detect(samples)
+    assert len(trips) == 1
+    assert trips[0]['start'] == T0 + 60
+    assert trips[0]['end'] == end + 60
+    assert trips[0]['distance'] > 3
+    assert det.current is None
+
+
+def test_short_stop_does_not_split():
+    samples = drive(T0)
+    end = samples[-1][0]
+    samples += [
+        (end + 60, 'P', 39.94, end + 60, True),
+        (end + 120, 'D', 39.95, end + 120, True),
+    ]
+    trips, det = detect(samples)
+    assert trips == []
+    assert det.current and det.current['parked_at'] is None
+
+
+def test_sleeping_car_ends_trip_by_poll_time():
+    samples = drive(T0)
+    end = samples[-1][0]
+    samples.append((end + 60, 'P', 39.94, end + 60, True))
+    # the car sleeps and keeps reporting the same snapshot
+    samples += [(end + 60, 'P', 39.94, end + 120 + i * 60, True) for i in range(20)]
+    morning = end + 12 * 3600
+    samples += drive(morning, lat=39.94)
+    trips, det = detect(samples)
+    assert len(trips) == 1
+    assert trips[0]['end'] == end + 60
+    assert det.current['start'] == morning + 60
+
+
+def test_offline_in_park_ends_trip():
+    samples = drive(T0)
+    end = samples[-1][0]
+    samples += [
+        (end + 60, 'P', 39.94, end + 60, True),
+        (end + 60, 'P', 39.94, end + 90, False),
+    ]
+    trips, _ = detect(samples)
+    assert len(trips) == 1
+
+
+def test_drive_after_long_gap_starts_new_trip():
+    samples = drive(T0)
+    end = samples[-1][0]
+    samples.append((end + 60, 'P', 39.94, end + 60, True))
+    # no poll while parked, the next sample is already driving again
+    samples += drive(end + 3600, lat=39.94)
+    trips, det = detect(samples)
+    assert len(trips) == 1
+    assert trips[0]['end'] == end + 60
+    assert det.current['start'] == end + 3600 + 60
+
+
+def test_too_short_trip_is_dropped():
+    samples = [
+        (T0, 'P', 39.9, T0, True),
+        (T0 + 60, 'D', 39.9, T0 + 60, True),
+        (T0 + 120, 'P', 39.9, T0 + 120, True),
+        (T0 + 120 + TRIP_END_GRACE, 'P', 39.9, T0 + 120 + TRIP_END_GRACE, True),
+    ]
+    trips, det = detect(samples)
+    assert trips == []
+    assert not det.trips